@@ -0,0 +1,141 @@
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+from deals_db import migrate, search_deals, top_deals, alerts_for_deal
+
+# BENCHMARK: hot deals.db queries on a generated dataset, before and after the
+# migration (indexes + FTS5). Runs in a temp file, never touches deals.db.
+# Usage: python benchmark.py [deals]   (default 1,000,000)
+
+DEALS = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+SITES = max(1, DEALS // 5)
+ALERTS = DEALS // 2
+RUNS = 20
+BATCH = 50_000
+
+BRANDS = ["Adobe", "Shopify", "NordVPN", "DigitalOcean", "Notion", "Canva", "Figma", "Slack",
+          "Zoom", "Dropbox", "Grammarly", "Semrush", "HubSpot", "Webflow", "Airtable", "Miro"]
+WORDS = ["annual", "plan", "discount", "trial", "pro", "team", "premium", "starter", "bundle",
+         "creative", "cloud", "hosting", "storage", "seats", "monthly", "lifetime", "offer", "promo"]
+# Long tail of product / feature names: most searches are for something specific
+RARE_WORDS = [f"{a}{b}{c}" for a in ("zen", "nova", "flux", "orbi", "vex", "quan", "lumi", "kora")
+              for b in ("ra", "to", "li", "ma", "xo", "pe", "du", "ki")
+              for c in ("n", "s", "x", "q", "r", "l", "m", "t", "d", "v")]
+
+# The old schema: no secondary indexes, no FTS
+BASE_SCHEMA = """
+    CREATE TABLE sites (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL, url TEXT NOT NULL,
+        reputation_score REAL DEFAULT 1.0, status TEXT DEFAULT 'active', process_status TEXT DEFAULT 'idle',
+        raw_content TEXT, last_checked DATETIME, lease_owner TEXT, lease_expires REAL
+    );
+    CREATE TABLE deals (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, site_id INTEGER, brand TEXT, code TEXT, discount_amount REAL,
+        duration_months INTEGER, value_score REAL, summary TEXT, raw_text TEXT,
+        detected_at DATETIME DEFAULT CURRENT_TIMESTAMP, status TEXT DEFAULT 'active', url TEXT
+    );
+    CREATE TABLE alerts (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, deal_id INTEGER, recipient_email TEXT,
+        channel TEXT DEFAULT 'email', sent_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    );
+"""
+
+
+def sentence(rng, n):
+    return " ".join(rng.choice(WORDS) for _ in range(n))
+
+def generate(conn, rng):
+    conn.executescript(BASE_SCHEMA)
+    conn.executemany(
+        "INSERT INTO sites (name, url, process_status) VALUES (?, ?, ?)",
+        # The backlog is the newest 1% of scans
+        ((f"site{i}", f"https://site{i}.example", "pending" if i >= SITES * 0.99 else "processed") for i in range(SITES))
+    )
+    for start in range(0, DEALS, BATCH):
+        rows = []
+        for i in range(start, min(start + BATCH, DEALS)):
+            brand = rng.choice(BRANDS)
+            discount = rng.choice([10, 15, 20, 25, 30, 40, 50, 70])
+            days = rng.choice([30, 90, 365])
+            rows.append((
+                rng.randrange(1, SITES + 1), brand, discount, days // 30, discount * days / 1.0,
+                f"{brand} {discount}% off {sentence(rng, 4)}", f"{brand} {sentence(rng, 30)} {rng.choice(RARE_WORDS)}",
+                "active" if rng.random() < 0.2 else "expired"
+            ))
+        conn.executemany("""
+            INSERT INTO deals (site_id, brand, discount_amount, duration_months, value_score, summary, raw_text, status)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, rows)
+    conn.executemany(
+        "INSERT INTO alerts (deal_id, recipient_email) VALUES (?, ?)",
+        ((rng.randrange(1, DEALS + 1), f"sniper{i % 1000}@example.com") for i in range(ALERTS))
+    )
+    conn.commit()
+
+def like_search(conn, text, limit=20):
+    """
+    What search looks like without FTS: every word must appear somewhere, best score first.
+    """
+    sql = "SELECT id FROM deals WHERE status = 'active'"
+    params = []
+    for word in text.split():
+        sql += " AND (brand LIKE ? OR summary LIKE ? OR raw_text LIKE ?)"
+        params += [f"%{word}%"] * 3
+    sql += " ORDER BY value_score DESC LIMIT ?"
+    return conn.execute(sql, params + [limit]).fetchall()
+
+def timed(fn, runs=RUNS):
+    samples = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(samples)
+
+def run_queries(conn, rng, searcher):
+    deal_ids = [rng.randrange(1, DEALS + 1) for _ in range(RUNS)]
+    return {
+        "pending sites": timed(lambda: conn.execute(
+            "SELECT id FROM sites WHERE process_status = 'pending' AND (lease_expires IS NULL OR lease_expires < ?) ORDER BY id LIMIT 16",
+            (time.time(),)).fetchall()),
+        "top active deals": timed(lambda: top_deals(conn, 20)),
+        "alerts by deal": timed(lambda: alerts_for_deal(conn, deal_ids.pop())),
+        "search 'novaxon'": timed(lambda: searcher("novaxon"), runs=5),
+        "search 'figma kora'": timed(lambda: searcher("figma kora"), runs=5),
+        "search 'lifetime'": timed(lambda: searcher("lifetime"), runs=5)
+    }
+
+if __name__ == "__main__":
+    rng = random.Random(42)
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+
+    print(f"[*] Generating {DEALS:,} deals, {SITES:,} sites, {ALERTS:,} alerts in {path}...")
+    t0 = time.perf_counter()
+    generate(conn, rng)
+    print(f"[+] Generated in {time.perf_counter() - t0:.1f}s")
+
+    before = run_queries(conn, rng, lambda q: like_search(conn, q))
+
+    t0 = time.perf_counter()
+    conn.execute("BEGIN IMMEDIATE")
+    migrate(conn)
+    conn.commit()
+    print(f"[+] Migration (indexes + FTS build) took {time.perf_counter() - t0:.1f}s")
+
+    after = run_queries(conn, rng, lambda q: search_deals(conn, q))
+
+    print(f"\n{'query':<26}{'before (ms)':>14}{'after (ms)':>14}{'speedup':>10}")
+    for name in before:
+        speedup = before[name] / after[name] if after[name] else float("inf")
+        print(f"{name:<26}{before[name]:>14.2f}{after[name]:>14.3f}{speedup:>9.1f}x")
+    print(f"\n[*] DB size: {os.path.getsize(path) / 1e6:.0f} MB")
+
+    conn.close()
+    os.remove(path)
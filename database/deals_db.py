@@ -0,0 +1,160 @@
+import os
+import re
+import sqlite3
+import threading
+
+# DEALS DB: migration + query API
+# Brings any deals.db (including ones created from older schemas) up to
+# schema.sql: missing columns, the indexes behind the hot queries, and an FTS5
+# index over deal brand / summary / raw_text kept in sync by triggers.
+
+DB_PATH = os.environ.get("CYBERHOUND_DB", os.path.join(os.path.dirname(os.path.abspath(__file__)), "deals.db"))
+
+# Columns added after the first schema: {table: [(column, declaration)]}
+COLUMNS = {
+    "sites": [
+        ("process_status", "TEXT DEFAULT 'idle'"),
+        ("raw_content", "TEXT"),
+        ("lease_owner", "TEXT"),
+        ("lease_expires", "REAL")
+    ],
+    "deals": [
+        ("brand", "TEXT"),
+        ("summary", "TEXT"),
+        ("url", "TEXT")
+    ]
+}
+
+INDEXES = [
+    # Bridge work claiming: WHERE process_status = 'pending' AND lease_expires < ?
+    "CREATE INDEX IF NOT EXISTS idx_sites_pending ON sites(process_status, lease_expires)",
+    # "Active deals by score" listings
+    "CREATE INDEX IF NOT EXISTS idx_deals_status_score ON deals(status, value_score DESC)",
+    "CREATE INDEX IF NOT EXISTS idx_deals_site ON deals(site_id)",
+    # Alert lookups / "already alerted?" checks
+    "CREATE INDEX IF NOT EXISTS idx_alerts_deal ON alerts(deal_id)"
+]
+
+# External-content FTS5 table: the text lives once, in deals
+FTS_TABLE = "CREATE VIRTUAL TABLE deals_fts USING fts5(brand, summary, raw_text, content='deals', content_rowid='id')"
+FTS_TRIGGERS = [
+    """CREATE TRIGGER IF NOT EXISTS deals_fts_ai AFTER INSERT ON deals BEGIN
+        INSERT INTO deals_fts(rowid, brand, summary, raw_text) VALUES (new.id, new.brand, new.summary, new.raw_text);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS deals_fts_ad AFTER DELETE ON deals BEGIN
+        INSERT INTO deals_fts(deals_fts, rowid, brand, summary, raw_text) VALUES ('delete', old.id, old.brand, old.summary, old.raw_text);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS deals_fts_au AFTER UPDATE OF brand, summary, raw_text ON deals BEGIN
+        INSERT INTO deals_fts(deals_fts, rowid, brand, summary, raw_text) VALUES ('delete', old.id, old.brand, old.summary, old.raw_text);
+        INSERT INTO deals_fts(rowid, brand, summary, raw_text) VALUES (new.id, new.brand, new.summary, new.raw_text);
+    END"""
+]
+
+DEAL_COLUMNS = "d.id, d.brand, d.summary, d.value_score, d.discount_amount, d.duration_months, d.url, d.status, d.detected_at"
+
+
+def _tables(conn):
+    return {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'view')")}
+
+def migrate(conn):
+    """
+    Idempotent; runs inside the caller's transaction (callers use BEGIN IMMEDIATE
+    so concurrent processes migrate once). The FTS index is built from existing
+    rows the first time it is created.
+    """
+    tables = _tables(conn)
+    for table, columns in COLUMNS.items():
+        if table not in tables:
+            continue
+        existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+        for column, declaration in columns:
+            if column not in existing:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {declaration}")
+
+    for statement in INDEXES:
+        table = statement.split(" ON ")[1].split("(")[0]
+        if table in tables:
+            conn.execute(statement)
+
+    if "deals" in tables:
+        if "deals_fts" not in tables:
+            conn.execute(FTS_TABLE)
+            conn.execute("INSERT INTO deals_fts(deals_fts) VALUES ('rebuild')")
+        for statement in FTS_TRIGGERS:
+            conn.execute(statement)
+
+_migrated = set()
+_migrate_lock = threading.Lock()
+
+def connect(path=DB_PATH):
+    """
+    Opens deals.db, migrating it on first use in this process so readers (the API)
+    work even before a bridge has run.
+    """
+    conn = sqlite3.connect(path, timeout=30)
+    conn.row_factory = sqlite3.Row
+    with _migrate_lock:
+        if path not in _migrated:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                migrate(conn)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            _migrated.add(path)
+    return conn
+
+def fts_query(text):
+    """
+    Turns free text into a safe FTS5 query: every word must match, the last
+    one as a prefix ("adobe creat" finds "Adobe Creative Cloud").
+    """
+    words = re.findall(r"\w+", text or "")
+    if not words:
+        return None
+    terms = [f'"{w}"' for w in words]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+def search_deals(conn, text, limit=20, status="active"):
+    """
+    Full-text search over brand, summary and raw_text, best matches first
+    (bm25, brand hits weighted highest). status=None searches every deal.
+    """
+    query = fts_query(text)
+    if not query:
+        return []
+    sql = f"""
+        SELECT {DEAL_COLUMNS}, bm25(deals_fts, 10.0, 3.0, 1.0) AS rank
+        FROM deals_fts JOIN deals d ON d.id = deals_fts.rowid
+        WHERE deals_fts MATCH ?
+    """
+    params = [query]
+    if status:
+        sql += " AND d.status = ?"
+        params.append(status)
+    sql += " ORDER BY rank LIMIT ?"
+    params.append(limit)
+    return [dict(row) for row in conn.execute(sql, params)]
+
+def top_deals(conn, limit=20, status="active"):
+    return [dict(row) for row in conn.execute(
+        f"SELECT {DEAL_COLUMNS} FROM deals d WHERE d.status = ? ORDER BY d.value_score DESC LIMIT ?",
+        (status, limit)
+    )]
+
+def alerts_for_deal(conn, deal_id):
+    return [dict(row) for row in conn.execute("SELECT * FROM alerts WHERE deal_id = ? ORDER BY sent_at", (deal_id,))]
+
+# Usage: python deals_db.py            -> migrate deals.db
+#        python deals_db.py "adobe"   -> search it
+if __name__ == "__main__":
+    import sys
+    conn = connect()
+    if len(sys.argv) > 1:
+        for deal in search_deals(conn, " ".join(sys.argv[1:]), status=None):
+            print(f"[{deal['id']}] {deal['brand']}: {deal['summary']} (score {deal['value_score']})")
+    else:
+        print(f"[+] Migrated {DB_PATH}")
+    conn.close()
@@ -9,9 +9,13 @@ CREATE TABLE IF NOT EXISTS sites (
     status TEXT DEFAULT 'active', 
     process_status TEXT DEFAULT 'idle', 
     raw_content TEXT, 
-    last_checked DATETIME
+    last_checked DATETIME,
+    lease_owner TEXT, -- bridge worker currently analyzing the row
+    lease_expires REAL -- unix time; expired leases are re-claimed
 );
 
+CREATE INDEX IF NOT EXISTS idx_sites_pending ON sites(process_status, lease_expires);
+
 CREATE TABLE IF NOT EXISTS deals (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     site_id INTEGER,
@@ -43,3 +47,24 @@ CREATE TABLE IF NOT EXISTS alerts (
     sent_at DATETIME DEFAULT CURRENT_TIMESTAMP,
     FOREIGN KEY(deal_id) REFERENCES deals(id)
 );
+
+-- Hot query indexes (database/deals_db.py migrates older databases)
+CREATE INDEX IF NOT EXISTS idx_deals_status_score ON deals(status, value_score DESC);
+CREATE INDEX IF NOT EXISTS idx_deals_site ON deals(site_id);
+CREATE INDEX IF NOT EXISTS idx_alerts_deal ON alerts(deal_id);
+
+-- Full-text search over deals (external content: text is stored once, in deals)
+CREATE VIRTUAL TABLE IF NOT EXISTS deals_fts USING fts5(brand, summary, raw_text, content='deals', content_rowid='id');
+
+CREATE TRIGGER IF NOT EXISTS deals_fts_ai AFTER INSERT ON deals BEGIN
+    INSERT INTO deals_fts(rowid, brand, summary, raw_text) VALUES (new.id, new.brand, new.summary, new.raw_text);
+END;
+
+CREATE TRIGGER IF NOT EXISTS deals_fts_ad AFTER DELETE ON deals BEGIN
+    INSERT INTO deals_fts(deals_fts, rowid, brand, summary, raw_text) VALUES ('delete', old.id, old.brand, old.summary, old.raw_text);
+END;
+
+CREATE TRIGGER IF NOT EXISTS deals_fts_au AFTER UPDATE OF brand, summary, raw_text ON deals BEGIN
+    INSERT INTO deals_fts(deals_fts, rowid, brand, summary, raw_text) VALUES ('delete', old.id, old.brand, old.summary, old.raw_text);
+    INSERT INTO deals_fts(rowid, brand, summary, raw_text) VALUES (new.id, new.brand, new.summary, new.raw_text);
+END;
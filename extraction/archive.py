@@ -0,0 +1,116 @@
+import datetime
+import gzip
+import json
+import os
+from storage_helper import get_backend, content_hash, cas_update
+
+# ARCHIVE: compressed, partitioned history of raw intel
+#
+# archive/{hound}/{date}/sweep_{ts}.ndjson.gz   one object per sweep
+# archive/{hound}/{date}/manifest.ndjson        one line per scan that day:
+#     {"target", "scanned_at", "hash", "object", "offset", "length"}
+# archive/{hound}/latest.json                   {target: latest entry + "first" date}
+#
+# Every record in a sweep object is its own gzip member (concatenated members
+# are still a valid .gz file), so a manifest's (offset, length) can be fetched
+# with a ranged read and decompressed on its own. Manifests are partitioned by
+# day, so an append only rewrites that day's index; latest.json (one line per
+# target) is all a sweep needs for dedup. A target's history is the daily
+# manifests from its first date on, plus one small ranged read per scan.
+
+# Configuration
+HOUND_NAME = os.environ.get("CYBERHOUND_HOUND", "cyberhound")
+MANIFEST_RETRIES = 25
+
+
+def manifest_name(hound, day):
+    return f"archive/{hound}/{day}/manifest.ndjson"
+
+def latest_name(hound):
+    return f"archive/{hound}/latest.json"
+
+def sweep_object_name(hound, now):
+    return f"archive/{hound}/{now.strftime('%Y-%m-%d')}/sweep_{now.strftime('%Y%m%d_%H%M%S_%f')}.ndjson.gz"
+
+def read_manifest(backend, day, hound=HOUND_NAME):
+    content = backend.read(manifest_name(hound, day)) or ""
+    return [json.loads(line) for line in content.splitlines() if line.strip()]
+
+def read_latest(backend, hound=HOUND_NAME):
+    content = backend.read(latest_name(hound))
+    return json.loads(content) if content else {}
+
+def append_manifest(backend, entries, day, hound=HOUND_NAME):
+    """
+    Appends entries to the day's manifest and records them as each target's latest scan.
+    """
+    lines = "".join(json.dumps(e, separators=(",", ":")) + "\n" for e in entries)
+    appended = cas_update(backend, manifest_name(hound, day), lambda content: (content or "") + lines, 'application/x-ndjson', MANIFEST_RETRIES)
+
+    def merge_latest(content):
+        latest = json.loads(content) if content else {}
+        for entry in entries:
+            first = latest.get(entry["target"], {}).get("first", day)
+            latest[entry["target"]] = {**entry, "first": first}
+        return json.dumps(latest, separators=(",", ":"))
+    return cas_update(backend, latest_name(hound), merge_latest, 'application/json', MANIFEST_RETRIES) and appended
+
+def archive_sweep(items, hound=HOUND_NAME):
+    """
+    Writes a sweep of (data, target_name) pairs as ONE compressed NDJSON object
+    and indexes every scan in the manifest. A scan whose text hash matches the
+    target's latest archived record is indexed against that record instead of
+    being stored again.
+    Returns the sweep object's URI (None if nothing new was stored).
+    """
+    backend = get_backend()
+    now = datetime.datetime.now()
+    object_name = sweep_object_name(hound, now)
+
+    latest = read_latest(backend, hound)
+
+    body = bytearray()
+    entries = []
+    for data, target_name in items:
+        digest = content_hash(data.get("raw_text"))
+        entry = {"target": target_name, "scanned_at": data.get("scanned_at", now.isoformat()), "hash": digest}
+
+        previous = latest.get(target_name)
+        if previous and previous["hash"] == digest:
+            entry.update(object=previous["object"], offset=previous["offset"], length=previous["length"])
+        else:
+            member = gzip.compress((json.dumps({**data, "content_hash": digest}, separators=(",", ":")) + "\n").encode("utf-8"))
+            entry.update(object=object_name, offset=len(body), length=len(member))
+            body.extend(member)
+        latest[target_name] = entry
+        entries.append(entry)
+
+    uri = None
+    if body:
+        backend.write(object_name, bytes(body), content_type='application/gzip')
+        uri = backend.uri(object_name)
+        print(f"[+] Archived {len(body)} compressed bytes to {uri}")
+    if entries:
+        append_manifest(backend, entries, now.strftime('%Y-%m-%d'), hound)
+    return uri
+
+def target_history(target_name, hound=HOUND_NAME, since=None):
+    """
+    Yields a target's archived scans (oldest first) using only the daily
+    manifests (from its first scan, or `since` "YYYY-MM-DD") and ranged reads.
+    """
+    backend = get_backend()
+    info = read_latest(backend, hound).get(target_name)
+    if not info:
+        return
+    day = datetime.date.fromisoformat(max(since or info["first"], info["first"]))
+    today = datetime.date.today()
+    while day <= today:
+        for entry in read_manifest(backend, day.isoformat(), hound):
+            if entry["target"] != target_name:
+                continue
+            member = backend.read_range(entry["object"], entry["offset"], entry["length"])
+            record = json.loads(gzip.decompress(member))
+            record["scanned_at"] = entry["scanned_at"]
+            yield record
+        day += datetime.timedelta(days=1)
@@ -0,0 +1,118 @@
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from playwright.async_api import async_playwright
+
+# Configuration
+# A context is recycled after serving this many pages...
+PAGES_PER_CONTEXT = int(os.environ.get("NOSE_PAGES_PER_CONTEXT", "25"))
+# ...or once a page in it reports a JS heap above this size.
+CONTEXT_MEMORY_MB = float(os.environ.get("NOSE_CONTEXT_MEMORY_MB", "256"))
+
+# Stealth-like args to avoid immediate detection (shared by every scraper)
+LAUNCH_ARGS = [
+    '--disable-blink-features=AutomationControlled',
+    '--no-sandbox',
+    '--disable-setuid-sandbox'
+]
+
+HEAP_PROBE_JS = "performance.memory ? performance.memory.usedJSHeapSize : 0"
+
+
+class _PooledContext:
+    def __init__(self, context):
+        self.context = context
+        self.pages_served = 0
+
+
+class BrowserService:
+    """
+    One long-lived Chromium that every scraper borrows isolated contexts from.
+    Contexts are pooled per option set (user agent, viewport, ...) and recycled
+    after `pages_per_context` pages or once they pass `memory_mb` of JS heap.
+    """
+
+    def __init__(self, pages_per_context=PAGES_PER_CONTEXT, memory_mb=CONTEXT_MEMORY_MB):
+        self.pages_per_context = pages_per_context
+        self.memory_bytes = memory_mb * 1024 * 1024
+        self.browser = None
+        self._playwright = None
+        self._idle = {}
+        self._lock = asyncio.Lock()
+        self.stats = {"contexts_created": 0, "contexts_recycled": 0, "pages": 0}
+
+    async def start(self):
+        if self.browser:
+            return self
+        self._playwright = await async_playwright().start()
+        self.browser = await self._playwright.chromium.launch(headless=True, args=LAUNCH_ARGS)
+        print("[*] Browser service online (shared Chromium).")
+        return self
+
+    async def close(self):
+        for pooled_list in self._idle.values():
+            for pooled in pooled_list:
+                await pooled.context.close()
+        self._idle = {}
+        if self.browser:
+            await self.browser.close()
+            self.browser = None
+        if self._playwright:
+            await self._playwright.stop()
+            self._playwright = None
+        print(f"[*] Browser service offline. {self.stats}")
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def _borrow(self, key, options, policy):
+        async with self._lock:
+            idle = self._idle.get(key)
+            if idle:
+                return idle.pop()
+        context = await self.browser.new_context(**options)
+        if policy:
+            await policy.attach(context)
+        self.stats["contexts_created"] += 1
+        return _PooledContext(context)
+
+    async def _release(self, key, pooled, heap_bytes):
+        pooled.pages_served += 1
+        self.stats["pages"] += 1
+        if pooled.pages_served >= self.pages_per_context or heap_bytes >= self.memory_bytes:
+            self.stats["contexts_recycled"] += 1
+            await pooled.context.close()
+            return
+        async with self._lock:
+            self._idle.setdefault(key, []).append(pooled)
+
+    @asynccontextmanager
+    async def page(self, policy=None, **context_options):
+        """
+        Yields a fresh page inside a pooled context built with `context_options`
+        (the same kwargs as `browser.new_context`). An optional ResourcePolicy
+        is routed on the context when it is created. The page is closed on exit
+        and its context goes back to the pool unless it is due for recycling.
+        """
+        if not self.browser:
+            await self.start()
+
+        key = repr((policy.name if policy else None, sorted(context_options.items())))
+        pooled = await self._borrow(key, context_options, policy)
+        page = await pooled.context.new_page()
+        heap_bytes = 0
+        try:
+            yield page
+        finally:
+            try:
+                heap_bytes = await page.evaluate(HEAP_PROBE_JS) or 0
+            except Exception:
+                pass  # Page crashed or navigated away mid-probe
+            try:
+                await page.close()
+            except Exception:
+                pass
+            await self._release(key, pooled, heap_bytes)
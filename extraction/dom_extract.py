@@ -0,0 +1,40 @@
+# Single-round-trip card extraction.
+# Instead of a chain of locator awaits per card (count, inner_text, get_attribute...),
+# one page.evaluate() walks the whole grid in-page and returns plain records.
+
+# Field spec format (pure data, serialized into the page):
+#   {"selectors": [css, fallback_css, ...], "attr": "href" | None, "default": value}
+# The first selector that matches inside the card wins. With "attr" the attribute
+# is read (None if absent), otherwise the element's innerText. "default" is used
+# when no selector matches.
+
+CARD_EXTRACT_JS = """
+([cardSelector, fields, limit]) => {
+    const all = Array.from(document.querySelectorAll(cardSelector));
+    const cards = limit == null ? all : all.slice(0, limit);
+    const records = cards.map(card => {
+        const record = {};
+        for (const [name, spec] of Object.entries(fields)) {
+            let value = spec.default === undefined ? null : spec.default;
+            for (const selector of spec.selectors) {
+                const el = card.querySelector(selector);
+                if (el) {
+                    value = spec.attr ? el.getAttribute(spec.attr) : el.innerText;
+                    break;
+                }
+            }
+            record[name] = value;
+        }
+        return record;
+    });
+    return {total: all.length, cards: records};
+}
+"""
+
+async def extract_cards(page, card_selector, fields, limit=None):
+    """
+    Extracts `fields` from every card matching `card_selector` in one evaluate call.
+    Returns (total_cards_on_page, [record, ...]) with at most `limit` records.
+    """
+    result = await page.evaluate(CARD_EXTRACT_JS, [card_selector, fields, limit])
+    return result["total"], result["cards"]
@@ -0,0 +1,172 @@
+import json
+import os
+import threading
+import time
+from html.parser import HTMLParser
+from urllib.parse import urlparse
+import requests
+from requests.adapters import HTTPAdapter
+
+# Configuration
+# Pages whose server-rendered text is shorter than this are assumed to need JS.
+MIN_TEXT_CHARS = int(os.environ.get("NOSE_HTTP_MIN_CHARS", "800"))
+HTTP_TIMEOUT = float(os.environ.get("NOSE_HTTP_TIMEOUT", "10"))
+# Where the cheapest working tier per domain is remembered between sweeps
+TIER_FILE = os.environ.get("NOSE_TIER_FILE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "fetch_tiers.json"))
+# Domains learned as 'browser' get another HTTP attempt after this long (sites go server-rendered too)
+HTTP_REPROBE_SECONDS = float(os.environ.get("NOSE_HTTP_REPROBE_HOURS", "24")) * 3600
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml",
+    "Accept-Language": "en-US,en;q=0.9"
+}
+
+# Phrases that mean the server sent a JS shell instead of content
+JS_WALL_MARKERS = [
+    "enable javascript",
+    "javascript is disabled",
+    "javascript is required",
+    "requires javascript",
+    "checking your browser"
+]
+
+# Pooled session shared by every target (keep-alive across the sweep)
+SESSION = requests.Session()
+SESSION.mount("https://", HTTPAdapter(pool_connections=16, pool_maxsize=16))
+SESSION.mount("http://", HTTPAdapter(pool_connections=16, pool_maxsize=16))
+SESSION.headers.update(HEADERS)
+
+SKIP_TAGS = {"script", "style", "noscript", "template", "svg", "head"}
+BLOCK_TAGS = {"p", "div", "br", "li", "ul", "ol", "tr", "td", "th", "table", "section", "article",
+              "header", "footer", "nav", "main", "aside", "h1", "h2", "h3", "h4", "h5", "h6", "form"}
+
+
+class _TextExtractor(HTMLParser):
+    def __init__(self):
+        super().__init__()
+        self.parts = []
+        self._skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIP_TAGS:
+            self._skip_depth += 1
+        elif tag in BLOCK_TAGS:
+            self.parts.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag in SKIP_TAGS:
+            self._skip_depth = max(0, self._skip_depth - 1)
+        elif tag in BLOCK_TAGS:
+            self.parts.append("\n")
+
+    def handle_data(self, data):
+        if not self._skip_depth:
+            self.parts.append(data)
+
+
+def html_to_text(html):
+    """
+    Approximates document.body.innerText: visible text, one block per line.
+    """
+    parser = _TextExtractor()
+    parser.feed(html)
+    parser.close()
+    lines = (" ".join(line.split()) for line in "".join(parser.parts).split("\n"))
+    return "\n".join(line for line in lines if line)
+
+
+def needs_js(text):
+    if len(text) < MIN_TEXT_CHARS:
+        return True
+    head = text[:2000].lower()
+    return any(marker in head for marker in JS_WALL_MARKERS)
+
+
+def fetch_http_text(url):
+    """
+    Plain GET + HTML-to-text. Returns (text, js_required):
+    (text, False) on success; (None, True) when the page came back but needs JS;
+    (None, False) when the request failed (timeout, 4xx/5xx, not HTML), which
+    says nothing about the page. Either miss means: escalate to the browser.
+    """
+    try:
+        response = SESSION.get(url, timeout=HTTP_TIMEOUT)
+        if response.status_code != 200 or "html" not in response.headers.get("Content-Type", ""):
+            print(f"[*] HTTP tier miss for {url}: status {response.status_code}")
+            return None, False
+        text = html_to_text(response.text)
+        return (None, True) if needs_js(text) else (text, False)
+    except Exception as e:
+        print(f"[*] HTTP tier miss for {url}: {e}")
+        return None, False
+
+
+class TierMemory:
+    """
+    Remembers which fetch tier ('http' or 'browser') works per domain, so
+    domains that need JS skip the wasted HTTP attempt on the next sweep.
+    Only a page that came back as a JS shell demotes a domain to 'browser'
+    (a failed request proves nothing), and those domains are re-probed over
+    HTTP every HTTP_REPROBE_SECONDS.
+    """
+
+    def __init__(self, path=TIER_FILE, reprobe_seconds=HTTP_REPROBE_SECONDS):
+        self.path = path
+        self.reprobe_seconds = reprobe_seconds
+        self._lock = threading.Lock()
+        try:
+            with open(path, "r") as f:
+                self.domains = json.load(f)
+        except Exception:
+            self.domains = {}
+
+    @staticmethod
+    def _domain(url):
+        return (urlparse(url).hostname or "").lower()
+
+    def plan(self, target):
+        """
+        Tier to try first. A target's own 'render' setting ('http' / 'browser')
+        wins over what was learned; 'auto' (default) uses the domain history.
+        """
+        render = target.get("render", "auto")
+        if render in ("http", "browser"):
+            return render
+        learned = self.domains.get(self._domain(target["url"]), {})
+        if learned.get("tier") != "browser":
+            return "http"
+        return "http" if time.time() - learned.get("probed_at", 0) >= self.reprobe_seconds else "browser"
+
+    def _entry(self, url):
+        return self.domains.setdefault(self._domain(url), {"tier": "http", "http": 0, "browser": 0})
+
+    def record(self, url, tier):
+        """
+        A fetch via `tier` worked. An HTTP success (re)learns the domain as 'http'.
+        """
+        with self._lock:
+            entry = self._entry(url)
+            entry[tier] = entry.get(tier, 0) + 1
+            if tier == "http":
+                entry["tier"] = "http"
+
+    def record_js_required(self, url):
+        """
+        The HTTP tier got a JS shell: use the browser until the next re-probe.
+        """
+        with self._lock:
+            entry = self._entry(url)
+            entry["tier"] = "browser"
+            entry["probed_at"] = time.time()
+
+    def save(self):
+        try:
+            with self._lock:
+                with open(self.path, "w") as f:
+                    json.dump(self.domains, f, indent=2)
+        except Exception as e:
+            print(f"[!] Could not save fetch tiers: {e}")
+
+
+TIER_MEMORY = TierMemory()
@@ -0,0 +1,102 @@
+import os
+from urllib.parse import urlparse
+
+# Configuration
+# Set NOSE_BLOCK_RESOURCES=0 to load full pages again (debugging selectors, screenshots).
+BLOCKING_ENABLED = os.environ.get("NOSE_BLOCK_RESOURCES", "1") != "0"
+
+# Blocked requests are never fetched, so their size is unknown.
+# These are typical transfer sizes per resource type, used to estimate the savings.
+EST_BYTES = {
+    "image": 60_000,
+    "media": 500_000,
+    "font": 40_000,
+    "stylesheet": 30_000,
+    "script": 80_000,
+    "xhr": 5_000,
+    "fetch": 5_000,
+    "other": 5_000
+}
+
+# Analytics / ad networks that never carry deal text
+TRACKER_DOMAINS = [
+    "google-analytics.com",
+    "googletagmanager.com",
+    "googleadservices.com",
+    "doubleclick.net",
+    "facebook.net",
+    "connect.facebook.net",
+    "hotjar.com",
+    "segment.io",
+    "segment.com",
+    "optimizely.com",
+    "amazon-adsystem.com",
+    "adsrvr.org",
+    "bat.bing.com",
+    "clarity.ms"
+]
+
+# Heavy types we never read: we keep innerText and a few attributes only.
+# Stylesheets stay allowed because innerText depends on layout (hidden text).
+HEAVY_TYPES = ["image", "media", "font"]
+
+
+def _host_matches(host, domains):
+    return any(host == d or host.endswith("." + d) for d in domains)
+
+
+class ResourcePolicy:
+    """
+    Allow/deny rules for a scraper's requests, applied on the Playwright routing layer.
+    Allowed domains always pass; then denied domains and resource types are aborted.
+    Keeps counters of what was blocked and an estimate of the bytes saved.
+    """
+
+    def __init__(self, name, block_types=HEAVY_TYPES, block_domains=TRACKER_DOMAINS, allow_domains=()):
+        self.name = name
+        self.block_types = set(block_types)
+        self.block_domains = list(block_domains)
+        self.allow_domains = list(allow_domains)
+        self.stats = {"allowed": 0, "blocked": 0, "est_bytes_saved": 0, "blocked_by_type": {}}
+
+    def allows(self, resource_type, url):
+        host = (urlparse(url).hostname or "").lower()
+        if _host_matches(host, self.allow_domains):
+            return True
+        if _host_matches(host, self.block_domains):
+            return False
+        return resource_type not in self.block_types
+
+    async def handle(self, route):
+        request = route.request
+        resource_type = request.resource_type
+        try:
+            if self.allows(resource_type, request.url):
+                self.stats["allowed"] += 1
+                await route.continue_()
+                return
+
+            self.stats["blocked"] += 1
+            self.stats["est_bytes_saved"] += EST_BYTES.get(resource_type, EST_BYTES["other"])
+            by_type = self.stats["blocked_by_type"]
+            by_type[resource_type] = by_type.get(resource_type, 0) + 1
+            await route.abort("blockedbyclient")
+        except Exception:
+            pass  # Page closed while the request was in flight
+
+    async def attach(self, context):
+        if BLOCKING_ENABLED:
+            await context.route("**/*", self.handle)
+
+    def report(self):
+        s = self.stats
+        print(f"[*] Resource policy '{self.name}': blocked {s['blocked']} / {s['blocked'] + s['allowed']} requests, "
+              f"~{s['est_bytes_saved'] / 1024:.0f} KB saved {s['blocked_by_type']}")
+
+
+# Per-scraper policies
+POLICIES = {
+    "trigger": ResourcePolicy("trigger"),
+    "amazon": ResourcePolicy("amazon"),
+    "appsumo": ResourcePolicy("appsumo")
+}
@@ -1,7 +1,15 @@
 import asyncio
-from playwright.async_api import async_playwright
 import json
+import os
 import random
+import sys
+
+# Add parent dir to path to find the shared browser service
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from browser_service import BrowserService
+from resource_policy import POLICIES
+from dom_extract import extract_cards
 
 USER_AGENTS = [
     "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
@@ -9,77 +17,90 @@ USER_AGENTS = [
     "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:109.0) Gecko/20100101 Firefox/115.0"
 ]
 
-async def hunt_appsumo():
+# How many deal tiles to turn into intel per sweep
+MAX_CARDS = int(os.environ.get("APPSUMO_MAX_CARDS", "8"))
+
+# Card fields with selector fallbacks (see dom_extract.py)
+CARD_FIELDS = {
+    "title": {"selectors": ["h3"]},
+    "price": {"selectors": ["[data-test-id='price']"]},
+    # Image for the dashboard
+    "image": {"selectors": ["img"], "attr": "src"},
+    "link": {"selectors": ["a"], "attr": "href"}
+}
+
+async def hunt_appsumo(service=None, limit=MAX_CARDS):
     """
     INFILTRATION TARGET: AppSumo.com (Browse Section)
     OBJECTIVE: Extract Lifetime Deals (LTDs) with high ratings.
+    Pass a running BrowserService to share Chromium with other scrapers.
+    `limit` caps how many tiles are converted (None = the whole grid).
     """
     print("🐺 NOSE: Infiltrating AppSumo Sector...")
     
     intel_bag = []
 
-    async with async_playwright() as p:
-        # Stealth Mode: Random Agent + Headless
-        browser = await p.chromium.launch(headless=True)
-        context = await browser.new_context(
-            user_agent=random.choice(USER_AGENTS),
-            viewport={'width': 1920, 'height': 1080}
-        )
-        
-        page = await context.new_page()
-        
-        try:
-            # 1. Approach Target
-            await page.goto("https://appsumo.com/browse/", timeout=60000)
-            await page.wait_for_load_state("networkidle")
+    own_service = service is None
+    if own_service:
+        service = await BrowserService().start()
+
+    # Stealth Mode: Random Agent + Headless
+    context_options = {
+        "user_agent": random.choice(USER_AGENTS),
+        "viewport": {'width': 1920, 'height': 1080}
+    }
+
+    try:
+        async with service.page(policy=POLICIES["appsumo"], **context_options) as page:
+            try:
+                # 1. Approach Target
+                await page.goto("https://appsumo.com/browse/", timeout=60000)
+                await page.wait_for_load_state("networkidle")
             
-            # 2. Sniff Patterns (Deal Cards)
-            # AppSumo classes change, so we rely on structural locators if possible, or common classes.
-            # Looking for the main grid items.
-            deal_cards = await page.locator(".deal-tile").all()
+                # 2. Sniff Patterns (Deal Cards)
+                # AppSumo classes change, so we rely on structural locators if possible, or common classes.
+                # Looking for the main grid items.
+                total, cards = await extract_cards(page, ".deal-tile", CARD_FIELDS, limit)
             
-            print(f"🐺 NOSE: Detected {len(deal_cards)} potential signals.")
+                print(f"🐺 NOSE: Detected {total} potential signals.")
 
-            for i, card in enumerate(deal_cards[:8]): # Grab top 8
-                try:
-                    # Extract Data Points
-                    title = await card.locator("h3").first.inner_text(timeout=2000)
-                    
-                    # Prices often structured like "$39 $100"
-                    price_text = await card.locator("[data-test-id='price']").first.inner_text(timeout=2000)
-                    
-                    # Image for the dashboard
-                    img_src = await card.locator("img").first.get_attribute("src")
-                    
-                    # Link
-                    link = await card.locator("a").first.get_attribute("href")
-                    full_link = f"https://appsumo.com{link}" if link.startswith("/") else link
+                for card in cards:
+                    try:
+                        title = card["title"]
+                        # Prices often structured like "$39 $100"
+                        price_text = card["price"]
+                        img_src = card["image"]
+                        link = card["link"]
+                        if title is None or price_text is None or link is None:
+                            continue # Incomplete card, move to next target
+                        full_link = f"https://appsumo.com{link}" if link.startswith("/") else link
 
-                    # Construct Intel Packet
-                    intel = {
-                        "id": random.randint(1000, 9999),
-                        "brand": title,
-                        "summary": f"Lifetime Deal spotted: {price_text.replace(chr(10), ' ')}",
-                        "value_score": 90, # Placeholder, will be AI evaluated later
-                        "discount_amount": 0, # Logic to extract later
-                        "duration_months": 99, # Code for Lifetime
-                        "url": full_link,
-                        "image": img_src,
-                        "verdict": "UNVERIFIED LTD"
-                    }
-                    intel_bag.append(intel)
-                    print(f"   + Snagged: {title}")
+                        # Construct Intel Packet
+                        intel = {
+                            "id": random.randint(1000, 9999),
+                            "brand": title,
+                            "summary": f"Lifetime Deal spotted: {price_text.replace(chr(10), ' ')}",
+                            "value_score": 90, # Placeholder, will be AI evaluated later
+                            "discount_amount": 0, # Logic to extract later
+                            "duration_months": 99, # Code for Lifetime
+                            "url": full_link,
+                            "image": img_src,
+                            "verdict": "UNVERIFIED LTD"
+                        }
+                        intel_bag.append(intel)
+                        print(f"   + Snagged: {title}")
                     
-                except Exception as e:
-                    # Stealth failure, move to next target
-                    continue
+                    except Exception as e:
+                        # Stealth failure, move to next target
+                        continue
+
+            except Exception as e:
+                print(f"🚨 NOSE FAILURE: {e}")
+    finally:
+        POLICIES["appsumo"].report()
+        if own_service:
+            await service.close()
 
-        except Exception as e:
-            print(f"🚨 NOSE FAILURE: {e}")
-        
-        finally:
-            await browser.close()
-            
     return intel_bag
 
 # For local testing
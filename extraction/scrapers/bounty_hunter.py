@@ -2,93 +2,235 @@ import requests
 import random
 import uuid
 import re
+import os
+import json
+import codecs
+import bisect
+import threading
+
+# TARGET: RemoteOK API
+FEED_URL = "https://remoteok.com/api"
+HEADERS = {'User-Agent': 'Cyberhound-Bounty-Board/1.0'}
+
+# Limit the board to the 12 freshest targets
+BOARD_SIZE = int(os.environ.get("BOUNTY_BOARD_SIZE", "12"))
+
+# The only job fields the bounty builder reads; everything else (long HTML
+# descriptions, logos, salary blobs...) is dropped as soon as an item parses.
+JOB_FIELDS = ("id", "slug", "position", "company", "tags", "apply_url", "date")
+STREAM_CHUNK = 64 * 1024
+
+# Pooled session: keep-alive across polls
+SESSION = requests.Session()
+SESSION.headers.update(HEADERS)
+
+# Feed state between polls: validators for conditional requests and the
+# current board as (job_id, bounty) pairs, freshest first.
+FEED_STATE = {"etag": None, "last_modified": None, "board": []}
+_feed_lock = threading.Lock()
+
+def iter_json_array(chunks):
+    """
+    Yields the items of a top-level JSON array one by one as bytes arrive,
+    without ever holding the whole document or its object graph.
+    """
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    buf, pos, opened = "", 0, False
+
+    for chunk in chunks:
+        buf = buf[pos:] + utf8.decode(chunk)
+        pos = 0
+        while True:
+            while pos < len(buf) and buf[pos] in " \t\r\n,":
+                pos += 1
+            if pos >= len(buf):
+                break
+            if not opened:
+                if buf[pos] != "[":
+                    raise ValueError("Feed is not a JSON array")
+                opened = True
+                pos += 1
+                continue
+            if buf[pos] == "]":
+                return
+            try:
+                item, pos = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                break  # Item still incomplete, wait for more bytes
+            yield item
+
+    if buf[pos:].strip():
+        raise ValueError("Feed ended mid-item")
+
+def iter_feed_jobs(response):
+    """
+    Streams RemoteOK jobs, trimmed to JOB_FIELDS. Skips the legal notice item.
+    """
+    items = iter_json_array(response.iter_content(chunk_size=STREAM_CHUNK))
+    # The API returns a list, the first item is legal text, skip it.
+    next(items, None)
+    for item in items:
+        if isinstance(item, dict) and item.get('position'):
+            yield {k: item[k] for k in JOB_FIELDS if k in item}
+
+def job_key(job):
+    return str(job.get('id') or job.get('slug') or job.get('apply_url', ''))
+
+# --- CLASSIFIER RULE TABLES ---
+# First matching rule wins. Terms match whole words; a trailing * also
+# matches any word suffix (ENGINEER* -> ENGINEERING), so "ART" no longer hits "START".
+DIFFICULTY_RULES = [
+    ("LETHAL", ["SENIOR", "LEAD*", "ARCHITECT*", "CTO"]),
+    ("NOVICE", ["JUNIOR", "ENTRY", "INTERN", "INTERNSHIP"])
+]
+TYPE_RULES = [
+    ("DESIGN", ["DESIGN*", "ART"]),
+    ("MARKETING", ["MARKETING", "SALES", "GROWTH"]),
+    ("DEV", ["PYTHON", "DEV*", "ENGINEER*", "REACT*"])
+]
+
+class KeywordClassifier:
+    """
+    Compiles a rule table once into a single word-bounded regex and labels
+    a whole batch of texts in one scan over their concatenation.
+    """
+
+    def __init__(self, rules, default):
+        self.labels = [label for label, _ in rules]
+        self.default = default
+        groups = []
+        for i, (_, terms) in enumerate(rules):
+            alts = "|".join(re.escape(t[:-1]) + r"\w*" if t.endswith("*") else re.escape(t) for t in terms)
+            groups.append(f"(?P<r{i}>{alts})")
+        self.pattern = re.compile(r"\b(?:" + "|".join(groups) + r")\b", re.IGNORECASE)
+
+    def classify_many(self, texts):
+        starts, offset = [], 0
+        for text in texts:
+            starts.append(offset)
+            offset += len(text) + 1
+        best = [len(self.labels)] * len(starts)
+
+        for match in self.pattern.finditer("\n".join(texts)):
+            i = bisect.bisect_right(starts, match.start()) - 1
+            best[i] = min(best[i], int(match.lastgroup[1:]))
+
+        return [self.labels[b] if b < len(self.labels) else self.default for b in best]
+
+    def classify(self, text):
+        return self.classify_many([text])[0]
+
+DIFFICULTY_CLASSIFIER = KeywordClassifier(DIFFICULTY_RULES, "VETERAN")
+TYPE_CLASSIFIER = KeywordClassifier(TYPE_RULES, "RECON")
+
+def classify_jobs(jobs):
+    """
+    Returns [(difficulty, type), ...] for a batch of RemoteOK jobs.
+    Difficulty comes from the position title, type from the tags.
+    """
+    titles = [job.get('position', '') for job in jobs]
+    tags = [" ".join(str(t) for t in job.get('tags', [])) for job in jobs]
+    return list(zip(DIFFICULTY_CLASSIFIER.classify_many(titles), TYPE_CLASSIFIER.classify_many(tags)))
+
+# Reward ranges per difficulty (in hundreds of USDC)
+REWARD_RANGES = {
+    "LETHAL": (20, 50), # Random reward between 2k and 5k USDC
+    "NOVICE": (3, 8),
+    "VETERAN": (8, 20)
+}
+
+def build_bounty(job, difficulty, b_type):
+    # --- THE SPIN: FLAVOR TEXT GENERATION ---
+    title = job.get('position', '').upper()
+    company = job.get('company', 'UNKNOWN SYNDICATE').upper()
+    
+    # 1. REWARD (difficulty & type come from classify_jobs)
+    # Make the rewards huge and cryptographically specific to look cool
+    reward_val = random.randint(*REWARD_RANGES[difficulty]) * 100
+
+    # 2. "CYBERHOUND SPIN" ON DESCRIPTION
+    # Convert normal job descriptions into "Mercenary Briefs"
+    # We strip HTML and just grab a snippet, then flavor it.
+    tags_clean = [t.upper() for t in job.get('tags', [])[:3]]
+    flavor_text = f"TARGET: {company}. OBJECTIVE: {title}. REQUIRES: {', '.join(tags_clean)}."
+    
+    # 3. BUILD THE BOUNTY OBJECT
+    return {
+        "id": str(uuid.uuid4())[:8],
+        "client": company,
+        "task": title,
+        "description": flavor_text,
+        "reward": f"${reward_val} USDC",
+        "difficulty": difficulty,
+        "type": b_type,
+        "status": "OPEN",
+        "url": job.get('apply_url', '#'),
+        "timestamp": job.get('date', '')
+    }
 
 def hunt_bounties():
+    """
+    Polls RemoteOK with conditional requests (If-None-Match / If-Modified-Since).
+    Only jobs not already on the board are converted; they are merged in front
+    of the existing board. A 304 returns the current board unchanged.
+    """
     print("🐺 HEADHUNTER: Scanning Remote Frequencies for Targets...")
     
-    # TARGET: RemoteOK API
-    url = "https://remoteok.com/api"
-    headers = {'User-Agent': 'Cyberhound-Bounty-Board/1.0'}
-    
-    try:
-        response = requests.get(url, headers=headers)
-        jobs = response.json()
-        
-        # The API returns a list, the first item is legal text, skip it.
-        valid_jobs = jobs[1:]
-        
-        bounties = []
-        
-        # Limit to 12 freshest targets
-        for job in valid_jobs[:12]:
-            
-            # --- THE SPIN: FLAVOR TEXT GENERATION ---
-            title = job.get('position', '').upper()
-            company = job.get('company', 'UNKNOWN SYNDICATE').upper()
-            
-            # 1. DETERMINE DIFFICULTY & REWARD
-            # Make the rewards huge and cryptographically specific to look cool
-            if "SENIOR" in title or "LEAD" in title or "ARCHITECT" in title or "CTO" in title:
-                difficulty = "LETHAL"
-                # Random reward between 2k and 5k USDC
-                reward_val = random.randint(20, 50) * 100
-            elif "JUNIOR" in title or "ENTRY" in title or "INTERN" in title:
-                difficulty = "NOVICE"
-                reward_val = random.randint(3, 8) * 100
-            else:
-                difficulty = "VETERAN"
-                reward_val = random.randint(8, 20) * 100
-                
-            # 2. DETERMINE TYPE
-            tags = str(job.get('tags', [])).upper()
-            if "DESIGN" in tags or "ART" in tags:
-                b_type = "DESIGN"
-            elif "MARKETING" in tags or "SALES" in tags or "GROWTH" in tags:
-                b_type = "MARKETING"
-            elif "PYTHON" in tags or "DEV" in tags or "ENGINEER" in tags or "REACT" in tags:
-                b_type = "DEV"
-            else:
-                b_type = "RECON"
-
-            # 3. "CYBERHOUND SPIN" ON DESCRIPTION
-            # Convert normal job descriptions into "Mercenary Briefs"
-            # We strip HTML and just grab a snippet, then flavor it.
-            tags_clean = [t.upper() for t in job.get('tags', [])[:3]]
-            flavor_text = f"TARGET: {company}. OBJECTIVE: {title}. REQUIRES: {', '.join(tags_clean)}."
-            
-            # 4. BUILD THE BOUNTY OBJECT
-            bounty = {
-                "id": str(uuid.uuid4())[:8],
-                "client": company,
-                "task": title,
-                "description": flavor_text,
-                "reward": f"${reward_val} USDC",
-                "difficulty": difficulty,
-                "type": b_type,
-                "status": "OPEN",
-                "url": job.get('apply_url', '#'),
-                "timestamp": job.get('date', '')
-            }
-            
-            bounties.append(bounty)
-            
-        print(f"✅ HEADHUNTER: {len(bounties)} High-Value Targets Acquired.")
-        return bounties
-
-    except Exception as e:
-        print(f"❌ HEADHUNTER FAILED: {e}")
-        # Return a fallback "Ghost Bounty" if API fails so UI isn't empty
-        return [{
-            "id": "ERR-001",
-            "client": "SYSTEM FAILURE",
-            "task": "RECONNECT NEURAL LINK",
-            "description": "Remote uplink failed. Manual override required.",
-            "reward": ".00",
-            "difficulty": "NOVICE",
-            "type": "DEV",
-            "status": "TAKEN",
-            "url": "#"
-        }]
+    with _feed_lock:
+        try:
+            conditional = {}
+            if FEED_STATE["etag"]:
+                conditional['If-None-Match'] = FEED_STATE["etag"]
+            if FEED_STATE["last_modified"]:
+                conditional['If-Modified-Since'] = FEED_STATE["last_modified"]
+
+            # Streamed: we stop reading once BOARD_SIZE jobs have been seen
+            with SESSION.get(FEED_URL, headers=conditional, timeout=15, stream=True) as response:
+                if response.status_code == 304 and FEED_STATE["board"]:
+                    print("✅ HEADHUNTER: Frequencies unchanged (304). Board holds.")
+                    return [bounty for _, bounty in FEED_STATE["board"]]
+
+                response.raise_for_status()
+
+                known = {job_id for job_id, _ in FEED_STATE["board"]}
+                new_jobs = []
+                for scanned, job in enumerate(iter_feed_jobs(response), start=1):
+                    job_id = job_key(job)
+                    if job_id not in known:
+                        known.add(job_id)
+                        new_jobs.append((job_id, job))
+                    if scanned >= BOARD_SIZE:
+                        break
+
+            labels = classify_jobs([job for _, job in new_jobs])
+            new_entries = [(job_id, build_bounty(job, *label)) for (job_id, job), label in zip(new_jobs, labels)]
+
+            FEED_STATE["board"] = (new_entries + FEED_STATE["board"])[:BOARD_SIZE]
+            FEED_STATE["etag"] = response.headers.get('ETag')
+            FEED_STATE["last_modified"] = response.headers.get('Last-Modified')
+
+            bounties = [bounty for _, bounty in FEED_STATE["board"]]
+            print(f"✅ HEADHUNTER: {len(bounties)} High-Value Targets Acquired ({len(new_entries)} new).")
+            return bounties
+
+        except Exception as e:
+            print(f"❌ HEADHUNTER FAILED: {e}")
+            if FEED_STATE["board"]:
+                # Keep showing the last good board rather than the ghost
+                return [bounty for _, bounty in FEED_STATE["board"]]
+            # Return a fallback "Ghost Bounty" if API fails so UI isn't empty
+            return [{
+                "id": "ERR-001",
+                "client": "SYSTEM FAILURE",
+                "task": "RECONNECT NEURAL LINK",
+                "description": "Remote uplink failed. Manual override required.",
+                "reward": ".00",
+                "difficulty": "NOVICE",
+                "type": "DEV",
+                "status": "TAKEN",
+                "url": "#"
+            }]
 
 if __name__ == "__main__":
     # Test run
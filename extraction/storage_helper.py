@@ -1,114 +1,380 @@
-from google.cloud import storage
 import json
 import os
+import hashlib
 import datetime
+import random
+import threading
+import time
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from google.cloud import storage
+    from google.api_core import exceptions as gcs_errors
+    NotFound = gcs_errors.NotFound
+except ImportError:
+    storage = None  # Local backend only (dev / benchmarks)
+    gcs_errors = None
+    NotFound = FileNotFoundError
 
 # Configuration
 BUCKET_NAME = os.environ.get("CYBERHOUND_BUCKET", "cyberhound-raw-intel")
+# "gcs" (default) or "local" to run the nose without Google Cloud
+STORAGE_BACKEND = os.environ.get("CYBERHOUND_STORAGE", "gcs")
+LOCAL_STORAGE_DIR = os.environ.get("CYBERHOUND_LOCAL_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "local_bucket"))
+UPLOAD_WORKERS = int(os.environ.get("CYBERHOUND_UPLOAD_WORKERS", "8"))
+HOT_LIST_SIZE = 20
+# Per-target hash of the last archived page text
+HASH_INDEX = "index/last_hash.json"
+HOT_LIST = "latest_deals.json"
+# Compare-and-swap attempts before a hot list / hash index update gives up
+HOT_LIST_RETRIES = int(os.environ.get("CYBERHOUND_HOT_LIST_RETRIES", "25"))
 
-def upload_to_gcs(data, target_name):
+
+class PreconditionFailed(Exception):
     """
-    Uploads the extraction results to Google Cloud Storage.
-    Also updates the 'latest_deals.json' for the frontend proxy.
+    A conditional write lost the race: the object's generation changed since it was read.
     """
-    try:
-        # Initialize Client
-        storage_client = storage.Client()
-        
+
+
+class GCSBackend:
+    """
+    Storage client and bucket handle are created once and reused for every upload.
+    """
+
+    def __init__(self, bucket_name=BUCKET_NAME):
+        self.bucket_name = bucket_name
+        self.client = storage.Client()
         # Get/Create Bucket
         try:
-            bucket = storage_client.get_bucket(BUCKET_NAME)
+            self.bucket = self.client.get_bucket(bucket_name)
         except Exception:
+            self.bucket = self.client.create_bucket(bucket_name, location="US")
+
+    def uri(self, name):
+        return f"gs://{self.bucket_name}/{name}"
+
+    def write(self, name, content, content_type='application/json', cache_control=None, if_generation_match=None):
+        """
+        With `if_generation_match` the write only lands if the object is still at
+        that generation (0 = must not exist yet); otherwise PreconditionFailed.
+        """
+        blob = self.bucket.blob(name)
+        if cache_control:
+            blob.cache_control = cache_control
+        try:
+            blob.upload_from_string(content, content_type=content_type, if_generation_match=if_generation_match)
+        except gcs_errors.PreconditionFailed as e:
+            raise PreconditionFailed(name) from e
+
+    def read(self, name):
+        """
+        Returns the object's text, or None if it does not exist.
+        """
+        try:
+            return self.bucket.blob(name).download_as_text()
+        except NotFound:
+            return None
+
+    def read_range(self, name, offset, length):
+        return self.bucket.blob(name).download_as_bytes(start=offset, end=offset + length - 1)
+
+    def read_versioned(self, name):
+        """
+        Returns (text, generation); (None, 0) if the object does not exist.
+        """
+        blob = self.bucket.get_blob(name)
+        if blob is None:
+            return None, 0
+        try:
+            return blob.download_as_text(if_generation_match=blob.generation), blob.generation
+        except gcs_errors.PreconditionFailed as e:
+            raise PreconditionFailed(name) from e
+
+
+class LocalBackend:
+    """
+    Same interface as GCSBackend, backed by a directory (one file per object).
+    Generations live in a '.gen' sidecar and every write happens under a
+    lock file, so conditional writes behave like GCS across threads AND processes.
+    """
+
+    LOCK_STALE_SECONDS = 10
+
+    def __init__(self, root=LOCAL_STORAGE_DIR):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, name):
+        return os.path.join(self.root, *name.split("/"))
+
+    def uri(self, name):
+        return f"file://{self._path(name)}"
+
+    @contextmanager
+    def _locked(self, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        lock_path = f"{path}.lock"
+        while True:
             try:
-                bucket = storage_client.create_bucket(BUCKET_NAME, location="US")
-            except:
-                print(f"[!] Bucket {BUCKET_NAME} access/creation failed.")
-                return None
-
-        # 1. Upload Timestamped Archive
-        now = datetime.datetime.now()
-        timestamp = now.strftime("%Y%m%d_%H%M%S")
-        date_folder = now.strftime("%Y-%m-%d")
-        
-        blob_name = f"raw/{date_folder}/{target_name}_{timestamp}.json"
-        blob = bucket.blob(blob_name)
-        
-        json_content = json.dumps(data, indent=2)
-        
-        blob.upload_from_string(
-            json_content,
-            content_type='application/json'
-        )
-        
-        print(f"[+] Uploaded raw intel to gs://{BUCKET_NAME}/{blob_name}")
-
-        # 2. Update 'latest_deals.json' (The "Hot List")
-        # In a real scenario, this might need to be an aggregated list, 
-        # but for now we replace it with the latest single scan or append to a list.
-        # User requested "latest_deals.json" to be read by proxy.
-        # To make the ticker work, this file should ideally contain an ARRAY of deals.
-        # We will handle a simple append/update logic here if possible, 
-        # or just overwrite if that's the simplified instruction.
-        # Given the "Ticker" needs a list, let's try to maintain a list.
-        
-        latest_blob = bucket.blob('latest_deals.json')
-        current_deals = []
-        
+                fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                break
+            except FileExistsError:
+                try:
+                    if time.time() - os.path.getmtime(lock_path) > self.LOCK_STALE_SECONDS:
+                        os.remove(lock_path)  # Holder crashed
+                except OSError:
+                    pass
+                time.sleep(0.001)
+        try:
+            yield
+        finally:
+            os.close(fd)
+            os.remove(lock_path)
+
+    def _generation(self, path):
         try:
-            if latest_blob.exists():
-                content = latest_blob.download_as_text()
-                current_deals = json.loads(content)
+            with open(f"{path}.gen", "r") as f:
+                return int(f.read())
+        except (FileNotFoundError, ValueError):
+            return 0
+
+    def _replace(self, path, content):
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        if isinstance(content, bytes):
+            with open(tmp_path, "wb") as f:
+                f.write(content)
+        else:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(content)
+        os.replace(tmp_path, path)
+
+    def write(self, name, content, content_type='application/json', cache_control=None, if_generation_match=None):
+        path = self._path(name)
+        with self._locked(path):
+            generation = self._generation(path) if os.path.exists(path) else 0
+            if if_generation_match is not None and if_generation_match != generation:
+                raise PreconditionFailed(name)
+            self._replace(path, content)
+            self._replace(f"{path}.gen", str(generation + 1))
+
+    def read(self, name):
+        try:
+            with open(self._path(name), "r", encoding="utf-8") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def read_range(self, name, offset, length):
+        with open(self._path(name), "rb") as f:
+            f.seek(offset)
+            return f.read(length)
+
+    def read_versioned(self, name):
+        path = self._path(name)
+        with self._locked(path):
+            if not os.path.exists(path):
+                return None, 0
+            with open(path, "r", encoding="utf-8") as f:
+                return f.read(), self._generation(path)
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+def get_backend():
+    """
+    Returns the process-wide storage backend, created on first use.
+    """
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            if STORAGE_BACKEND == "local" or storage is None:
+                _backend = LocalBackend()
+            else:
+                _backend = GCSBackend()
+    return _backend
+
+def content_hash(text):
+    """
+    SHA-256 of the page text with whitespace normalized, so layout-only
+    reflows of the same copy hash the same.
+    """
+    normalized = " ".join((text or "").split())
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+def raw_blob_name(target_name, digest, now):
+    # Keyed by content: the same page text always maps to the same blob
+    return f"raw/{now.strftime('%Y-%m-%d')}/{target_name}_{digest[:16]}.json"
+
+def heartbeat_blob_name(now):
+    return f"heartbeats/{now.strftime('%Y-%m-%d')}/sweep_{now.strftime('%Y%m%d_%H%M%S_%f')}.json"
+
+def load_hash_index(backend):
+    try:
+        return json.loads(backend.read(HASH_INDEX) or "{}")
+    except Exception as e:
+        print(f"[*] Starting a fresh hash index ({e})")
+        return {}
+
+def cas_update(backend, name, update, content_type='application/json', retries=HOT_LIST_RETRIES):
+    """
+    Read-modify-write with a generation-conditioned write (safe with concurrent sweeps).
+    `update` maps the current content (or None) to the new content.
+    """
+    for attempt in range(retries):
+        try:
+            content, generation = backend.read_versioned(name)
+            backend.write(name, update(content), content_type=content_type, if_generation_match=generation)
+            return True
+        except PreconditionFailed:
+            time.sleep(random.uniform(0, 0.01 * (2 ** min(attempt, 6))))
+    print(f"[!] Update of {name} lost after {retries} contended attempts")
+    return False
+
+def merge_hash_index(content, digests):
+    try:
+        index = json.loads(content or "{}")
+    except ValueError as e:
+        print(f"[*] Starting a fresh hash index ({e})")
+        index = {}
+    index.update(digests)
+    return json.dumps(index, indent=2)
+
+def placeholder_deal(target_name, now, seq=0):
+    # The Bridge/Brain turns raw scans into real deals. Until it does, the hot list
+    # gets a placeholder so the frontend ticker (which expects Deal[]) has something to show.
+    # The frontend keys on id: timestamp + 2-digit sequence keeps a sweep's ids unique
+    # (and below 2^53, so they stay exact as JS numbers).
+    return {
+        "id": int(now.strftime("%Y%m%d%H%M%S")) * 100 + seq % 100,
+        "site_id": 0,
+        "brand": target_name,
+        "summary": f"Fresh scan from {target_name}. Analysis pending.",
+        "value_score": 50.0, # Placeholder
+        "discount_amount": 0,
+        "duration_months": 1
+    }
+
+def update_hot_list(backend, new_deals, limit=HOT_LIST_SIZE):
+    """
+    Prepends new deals to 'latest_deals.json' (read by the proxy) and keeps the newest `limit`.
+    Race-free: read with generation, write only if the generation is unchanged,
+    and retry with jittered backoff when another writer got there first.
+    """
+    new_deals = list(new_deals)
+    for attempt in range(HOT_LIST_RETRIES):
+        try:
+            content, generation = backend.read_versioned(HOT_LIST)
+            current_deals = []
+            try:
+                current_deals = json.loads(content) if content else []
                 if not isinstance(current_deals, list):
                     current_deals = []
+            except ValueError as e:
+                print(f"[*] Creating new latest_deals.json ({e})")
+
+            merged = (new_deals + current_deals)[:limit]
+            backend.write(HOT_LIST, json.dumps(merged, indent=2), cache_control='no-cache', if_generation_match=generation)
+            print(f"[+] Updated {backend.uri(HOT_LIST)}")
+            return True
+        except PreconditionFailed:
+            time.sleep(random.uniform(0, 0.01 * (2 ** min(attempt, 6))))
+
+    print(f"[!] Hot list update lost after {HOT_LIST_RETRIES} contended attempts")
+    return False
+
+def upload_batch(items):
+    """
+    Uploads a sweep of (data, target_name) pairs.
+    Pages whose text hash matches the target's last archived hash are not
+    re-uploaded (that would re-fire the brain); they are listed in one small
+    heartbeat record instead. Changed pages are archived in parallel, then
+    the hot list and hash index are updated ONCE for the whole batch.
+    Returns one URI per item: the raw archive, the heartbeat, or None on failure.
+    """
+    try:
+        backend = get_backend()
+    except Exception as e:
+        print(f"[!] Bucket {BUCKET_NAME} access/creation failed: {e}")
+        return [None] * len(items)
+
+    now = datetime.datetime.now()
+    index = load_hash_index(backend)
+    digests = [content_hash(data.get("raw_text")) for data, _ in items]
+    changed = [index.get(target_name) != digest for (_, target_name), digest in zip(items, digests)]
+
+    def upload_raw(i):
+        data, target_name = items[i]
+        blob_name = raw_blob_name(target_name, digests[i], now)
+        try:
+            backend.write(blob_name, json.dumps({**data, "content_hash": digests[i]}, separators=(",", ":")))
+            print(f"[+] Uploaded raw intel to {backend.uri(blob_name)}")
+            return backend.uri(blob_name)
         except Exception as e:
-            print(f"[*] Creating new latest_deals.json ({e})")
-            
-        # Add new data (simplified: data is one site scan)
-        # We need to map the raw scan to the "Deal" format expected by Frontend 
-        # OR the Bridge does this.
-        # WAIT: The Bridge (`bridge.py`) is responsible for creating the 'Deals' from 'Raw'.
-        # The 'Raw' goes to DB. 
-        # The PROXY reads `latest_deals.json`.
-        # This implies the BRIDGE should be writing `latest_deals.json` after processing, 
-        # NOT the Nose (extraction). The Nose produces RAW.
-        # However, the user instruction implies: "your cloud-hosted 'Nose' drops a JSON file... and your React app fetches it".
-        # This skips the Brain/Bridge for the visual demo?
-        # OR the User assumes the Nose result IS the deal.
-        # Re-reading Step 10: "reads the `latest_deals.json` from your Google Cloud Bucket".
-        # Re-reading prompt: "The Bridge... picks up unprocessed data from `deals.db`...".
-        # If we are in Cloud Run without a persistent SQLite DB (deals.db is local file), 
-        # the Bridge needs to run in Cloud too or connect to Cloud SQL.
-        # For simplicity of this step ("Phase 5"), let's assume the NOSE writes the latest raw data 
-        # and we display that, OR we update the Storage Helper to mock the 'processed' format 
-        # so the Frontend has something to show.
-        
-        # Let's ensure the Frontend gets the format it expects (Deal[]).
-        # We'll mock the 'intelligence' part here so the frontend works immediately 
-        # with data from the Nose, even if it's "raw" interpreted as "deal".
-        
-        new_deal = {
-            "id": int(timestamp.replace("_","")),
-            "site_id": 0,
-            "brand": target_name,
-            "summary": f"Fresh scan from {target_name}. Analysis pending.",
-            "value_score": 50.0, # Placeholder
-            "discount_amount": 0,
-            "duration_months": 1
+            print(f"[!] Upload Failed for {target_name}: {e}")
+            return None
+
+    uris = [None] * len(items)
+    changed_idx = [i for i in range(len(items)) if changed[i]]
+    if changed_idx:
+        with ThreadPoolExecutor(max_workers=max(1, min(UPLOAD_WORKERS, len(changed_idx)))) as pool:
+            for i, uri in zip(changed_idx, pool.map(upload_raw, changed_idx)):
+                uris[i] = uri
+
+    unchanged_idx = [i for i in range(len(items)) if not changed[i]]
+    if unchanged_idx:
+        heartbeat = {
+            "scanned_at": now.isoformat(),
+            "unchanged": [{"target_name": items[i][1], "content_hash": digests[i]} for i in unchanged_idx]
         }
-        
-        # Prepend and limit to 20
-        current_deals.insert(0, new_deal)
-        current_deals = current_deals[:20]
-        
-        latest_blob.upload_from_string(
-            json.dumps(current_deals, indent=2),
-            content_type='application/json',
-            cache_control='no-cache'
-        )
-        
-        print(f"[+] Updated gs://{BUCKET_NAME}/latest_deals.json")
-        return f"gs://{BUCKET_NAME}/{blob_name}"
+        blob_name = heartbeat_blob_name(now)
+        try:
+            backend.write(blob_name, json.dumps(heartbeat))
+            print(f"[=] {len(unchanged_idx)} unchanged page(s), heartbeat at {backend.uri(blob_name)}")
+            for i in unchanged_idx:
+                uris[i] = backend.uri(blob_name)
+        except Exception as e:
+            print(f"[!] Heartbeat Failed: {e}")
 
-    except Exception as e:
-        print(f"[!] GCS Upload Failed: {e}")
-        return None
+    uploaded = [i for i in changed_idx if uris[i]]
+    if uploaded:
+        # Merged into the index as it is now: a concurrent sweep's entries survive
+        new_digests = {items[i][1]: digests[i] for i in uploaded}
+        try:
+            cas_update(backend, HASH_INDEX, lambda content: merge_hash_index(content, new_digests))
+        except Exception as e:
+            print(f"[!] Hash index update failed: {e}")
+
+        try:
+            update_hot_list(backend, reversed([placeholder_deal(items[i][1], now, seq) for seq, i in enumerate(uploaded)]))
+        except Exception as e:
+            print(f"[!] Hot list update failed: {e}")
+
+    return uris
+
+def upload_to_gcs(data, target_name):
+    """
+    Uploads the extraction results to Google Cloud Storage (or the local backend).
+    Also updates the 'latest_deals.json' for the frontend proxy.
+    """
+    return upload_batch([(data, target_name)])[0]
+
+# For local testing: many concurrent writers against the local stand-in
+if __name__ == "__main__":
+    import sys
+    import tempfile
+
+    writers = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+    backend = LocalBackend(tempfile.mkdtemp(prefix="cyberhound_cas_"))
+
+    def writer(i):
+        return update_hot_list(backend, [{"id": i, "brand": f"Writer {i}"}], limit=writers)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=writers) as pool:
+        landed = sum(pool.map(writer, range(writers)))
+
+    ids = {d["id"] for d in json.loads(backend.read(HOT_LIST))}
+    print(f"[*] {writers} writers, {landed} updates landed, {len(ids)} deals on the list, "
+          f"{writers - len(ids)} lost, {time.perf_counter() - started:.2f}s")
@@ -0,0 +1,28 @@
+import asyncio
+import json
+import time
+from browser_service import BrowserService
+from trigger import TARGETS, crawl, report_timings, CONCURRENCY
+from scrapers.amazon import hunt_amazon
+from scrapers.appsumo import hunt_appsumo
+
+# COMBINED SWEEP: trigger targets + Amazon + AppSumo on ONE shared Chromium
+# Usage: python sweep.py
+
+async def sweep():
+    print("=== Cyberhound Combined Sweep Initialized ===")
+
+    async with BrowserService() as service:
+        started = time.perf_counter()
+        timings, amazon_deals, appsumo_deals = await asyncio.gather(
+            crawl(service, TARGETS),
+            hunt_amazon(service),
+            hunt_appsumo(service)
+        )
+        report_timings(timings, time.perf_counter() - started, min(CONCURRENCY, len(TARGETS)))
+
+    return amazon_deals + appsumo_deals
+
+if __name__ == "__main__":
+    deals = asyncio.run(sweep())
+    print(json.dumps(deals, indent=2))
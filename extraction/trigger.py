@@ -1,9 +1,13 @@
 import asyncio
-from playwright.async_api import async_playwright
 import datetime
 import os
 import json
-from storage_helper import upload_to_gcs
+import time
+from storage_helper import upload_batch
+from archive import archive_sweep
+from browser_service import BrowserService
+from resource_policy import POLICIES
+from http_fetch import TIER_MEMORY, fetch_http_text
 
 # Configuration
 TARGETS = [
@@ -11,11 +15,14 @@ TARGETS = [
     {"name": "Shopify", "url": "https://www.shopify.com/pricing"},
     {"name": "OpenAI", "url": "https://openai.com/api/pricing/"}
     # Add remaining 17 targets
+    # Optional per target: "render": "http" | "browser" | "auto" (default, learned per domain)
 ]
 
-async def check_site(page, target):
-    print(f"[*] Sniffing {target['name']} at {target['url']}...")
-    try:
+# Crawl tuning: number of targets sniffed at once
+CONCURRENCY = int(os.environ.get("NOSE_CONCURRENCY", "4"))
+
+async def browser_text(service, target):
+    async with service.page(policy=POLICIES["trigger"]) as page:
         await page.goto(target['url'])
         
         # Simple wait for network idle to ensure content loads
@@ -25,25 +32,98 @@ async def check_site(page, target):
             pass # Proceed even if network not fully idle
         
         # Text extraction
-        text_content = await page.evaluate("document.body.innerText")
+        return await page.evaluate("document.body.innerText")
+
+async def check_site(service, target, packets):
+    """
+    Fetches a target's text via the cheapest tier that works:
+    a pooled HTTP GET first, escalating to Chromium when the page needs JS
+    or the request failed (only the former is remembered for the domain).
+    The scan is queued on `packets` for the end-of-sweep batch upload.
+    Returns (text_content, tier).
+    """
+    print(f"[*] Sniffing {target['name']} at {target['url']}...")
+    try:
+        text_content, tier = None, "browser"
+        if TIER_MEMORY.plan(target) == "http":
+            text_content, js_required = await asyncio.to_thread(fetch_http_text, target['url'])
+            if text_content:
+                tier = "http"
+            elif js_required:
+                TIER_MEMORY.record_js_required(target['url'])
+
+        if not text_content:
+            text_content = await browser_text(service, target)
         
         if text_content:
+            TIER_MEMORY.record(target['url'], tier)
             data_packet = {
                 "target_name": target['name'],
                 "url": target['url'],
                 "scanned_at": datetime.datetime.now().isoformat(),
+                "fetch_tier": tier,
                 "raw_text": text_content
             }
             
-            # Save to Cloud Storage
-            upload_to_gcs(data_packet, target['name'])
+            packets.append((data_packet, target['name']))
             
-            print(f"[+] Successfully sniffed and uploaded {target['name']}")
+            print(f"[+] Successfully sniffed {target['name']} ({tier})")
         
-        return text_content
+        return text_content, tier
     except Exception as e:
         print(f"[!] Error sniffing {target['name']}: {e}")
-        return None
+        return None, None
+
+async def crawl(service, targets, concurrency=CONCURRENCY):
+    """
+    Sniffs targets concurrently. At most `concurrency` targets are in flight;
+    browser contexts are borrowed from the shared service only when needed.
+    Scans are uploaded as one batch once every target has been sniffed.
+    Returns per-target timings in TARGETS order.
+    """
+    gate = asyncio.Semaphore(max(1, concurrency))
+    timings = [None] * len(targets)
+    packets = []
+
+    async def sniff(index, target):
+        async with gate:
+            started = time.perf_counter()
+            text_content, tier = await check_site(service, target, packets)
+        timings[index] = {
+            "target": target['name'],
+            "seconds": round(time.perf_counter() - started, 2),
+            "ok": bool(text_content),
+            "tier": tier
+        }
+
+    await asyncio.gather(*(sniff(i, t) for i, t in enumerate(targets)))
+    TIER_MEMORY.save()
+
+    # Save to Cloud Storage (off the event loop), then the compressed sweep archive
+    if packets:
+        await asyncio.to_thread(upload_batch, packets)
+        try:
+            await asyncio.to_thread(archive_sweep, packets)
+        except Exception as e:
+            print(f"[!] Archive Failed: {e}")
+    return timings
+
+def report_timings(timings, wall_seconds, concurrency):
+    """
+    Prints per-target timings (slowest first) so the pool can be sized.
+    """
+    busy = sum(t['seconds'] for t in timings)
+    tiers = {}
+    for t in timings:
+        tiers[t['tier']] = tiers.get(t['tier'], 0) + 1
+    print(f"=== Crawl Report: {len(timings)} targets, {concurrency} slots, {wall_seconds:.2f}s wall ===")
+    for t in sorted(timings, key=lambda t: t['seconds'], reverse=True):
+        status = "OK" if t['ok'] else "MISS"
+        print(f"    {t['seconds']:>7.2f}s  [{status}] {t['target']} ({t['tier'] or '-'})")
+    if wall_seconds > 0:
+        # Close to `concurrency` means the pool is saturated; well below means it is oversized.
+        print(f"[*] Effective parallelism: {busy / wall_seconds:.2f}x (sum {busy:.2f}s)")
+    print(f"[*] Fetch tiers: {tiers}")
 
 async def main():
     print("=== Cyberhound Extraction Layer (Cloud Mode) Initialized ===")
@@ -52,14 +132,11 @@ async def main():
     if not os.environ.get("CYBERHOUND_BUCKET"):
          print("⚠️  Warning: CYBERHOUND_BUCKET env var not set. Using default 'cyberhound-raw-intel'.")
 
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=True)
-        page = await browser.new_page()
-        
-        for target in TARGETS:
-            await check_site(page, target)
-            
-        await browser.close()
+    async with BrowserService() as service:
+        started = time.perf_counter()
+        timings = await crawl(service, TARGETS)
+        report_timings(timings, time.perf_counter() - started, min(CONCURRENCY, len(TARGETS)))
+        POLICIES["trigger"].report()
 
 if __name__ == "__main__":
     asyncio.run(main())
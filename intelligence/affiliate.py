@@ -0,0 +1,132 @@
+import json
+import os
+import sys
+import threading
+import time
+
+# AFFILIATE MATCHER
+# Compiles affiliate_map.json once into an Aho-Corasick automaton over the
+# lowercased brand keys: one pass over the brand name finds every key it
+# contains, however large the map. Longest key wins ("Adobe Stock" over
+# "Adobe"), then earliest position, then map order. The file is re-read only
+# when its mtime/size changes.
+# Shared by the bridge and the cloud brain (stage it and the map next to main.py).
+
+# Configuration
+MAP_PATH = os.environ.get("CYBERHOUND_AFFILIATE_MAP", os.path.join(os.path.dirname(os.path.abspath(__file__)), "affiliate_map.json"))
+RELOAD_CHECK_SECONDS = float(os.environ.get("CYBERHOUND_AFFILIATE_RELOAD_SECONDS", "2"))
+
+
+class Automaton:
+    def __init__(self, patterns):
+        self.patterns = patterns
+        self.goto = [{}]
+        self.fail = [0]
+        self.out = [[]]
+        for idx, pattern in enumerate(patterns):
+            if pattern:
+                self._add(pattern, idx)
+        self._link()
+
+    def _add(self, pattern, idx):
+        node = 0
+        for ch in pattern:
+            nxt = self.goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self.goto)
+                self.goto.append({})
+                self.fail.append(0)
+                self.out.append([])
+                self.goto[node][ch] = nxt
+            node = nxt
+        self.out[node].append(idx)
+
+    def _link(self):
+        queue = list(self.goto[0].values())
+        for node in queue:
+            for ch, nxt in self.goto[node].items():
+                queue.append(nxt)
+                f = self.fail[node]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(ch, 0)
+                self.out[nxt] = self.out[nxt] + self.out[self.fail[nxt]]
+
+    def best(self, text):
+        """
+        Index of the longest pattern found in `text` (earliest, then lowest index on ties), or None.
+        """
+        node, best, best_rank = 0, None, None
+        for end, ch in enumerate(text):
+            while node and ch not in self.goto[node]:
+                node = self.fail[node]
+            node = self.goto[node].get(ch, 0)
+            for idx in self.out[node]:
+                length = len(self.patterns[idx])
+                rank = (-length, end - length, idx)
+                if best_rank is None or rank < best_rank:
+                    best, best_rank = idx, rank
+        return best
+
+
+class AffiliateMatcher:
+    def __init__(self, path=MAP_PATH, check_seconds=RELOAD_CHECK_SECONDS):
+        self.path = path
+        self.check_seconds = check_seconds
+        self._lock = threading.Lock()
+        self._state = ((), {}, Automaton([]))  # (keys, map, automaton)
+        self._signature = None
+        self._next_check = 0.0
+
+    def _reload_if_changed(self):
+        now = time.monotonic()
+        if now < self._next_check:
+            return
+        with self._lock:
+            if now < self._next_check:
+                return
+            self._next_check = now + self.check_seconds
+            try:
+                st = os.stat(self.path)
+                signature = (st.st_mtime_ns, st.st_size)
+                if signature == self._signature:
+                    return
+                with open(self.path, "r") as f:
+                    aff_map = json.load(f)
+                keys = tuple(aff_map)
+                self._state = (keys, aff_map, Automaton([key.lower() for key in keys]))
+                self._signature = signature
+                print(f"[*] Affiliate map compiled: {len(keys)} brands")
+            except Exception as e:
+                # Keep serving the last good map
+                print(f"[!] Affiliate map reload failed: {e}")
+
+    def match(self, brand_name):
+        """
+        Returns (key, entry) for the best affiliate key contained in brand_name, or None.
+        """
+        self._reload_if_changed()
+        keys, aff_map, automaton = self._state
+        idx = automaton.best((brand_name or "").lower())
+        if idx is None:
+            return None
+        return keys[idx], aff_map[keys[idx]]
+
+    def wrap(self, brand_name, raw_url):
+        """
+        Returns (url, matched_key): raw_url with the affiliate param appended, or unchanged.
+        """
+        found = self.match(brand_name)
+        if not found or not raw_url:
+            return raw_url, None
+        key, data = found
+        separator = "&" if "?" in raw_url else "?"
+        return f"{raw_url}{separator}{data['affiliate_param']}", key
+
+MATCHER = AffiliateMatcher()
+
+# Usage: python affiliate.py "Adobe Creative Cloud" "NordVPN Plus"
+if __name__ == "__main__":
+    for brand in sys.argv[1:]:
+        found = MATCHER.match(brand)
+        print(f"{brand} -> {found[0] if found else None}")
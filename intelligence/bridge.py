@@ -1,106 +1,259 @@
 import sqlite3
 import sys
 import os
-import json
+import random
+import socket
+import time
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
 
 # Add parent dir to path to find intelligence module
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from intelligence.processor import analyze_deal
+from intelligence.processor import analyze_scan, set_rate_limiter, CACHE
+from intelligence.delta import SQLiteStateStore
+from intelligence.affiliate import MATCHER as AFFILIATE
+from intelligence.rate_limiter import RateLimiter
+from database.deals_db import migrate
 
 DB_PATH = "../database/deals.db"
-AFFILIATE_MAP_PATH = "affiliate_map.json"
+
+# Analysis throughput: model calls in flight, and the API quota they share
+CONCURRENCY = int(os.environ.get("BRIDGE_CONCURRENCY", "4"))
+LLM_RPM = int(os.environ.get("LLM_REQUESTS_PER_MINUTE", "60"))
+LLM_TPM = int(os.environ.get("LLM_TOKENS_PER_MINUTE", "250000"))
+MAX_RETRIES = 4
+BACKOFF_SECONDS = 2.0
+QUOTA_MARKERS = ("429", "quota", "resource exhausted", "resource_exhausted", "rate limit")
+
+# Work claiming: each worker leases a batch of pending rows so N bridges can
+# drain the backlog in parallel; a crashed worker's lease simply expires.
+WORKER_ID = os.environ.get("BRIDGE_WORKER_ID", f"{socket.gethostname()}-{os.getpid()}")
+CLAIM_BATCH = int(os.environ.get("BRIDGE_CLAIM_BATCH", "16"))
+LEASE_SECONDS = int(os.environ.get("BRIDGE_LEASE_SECONDS", "600"))
+COMMIT_EVERY = int(os.environ.get("BRIDGE_COMMIT_EVERY", "8"))
 
 def wrap_affiliate_link(brand_name, raw_url):
     """
-    Checks the affiliate map and injects tracking tags if a brand match is found.
-    Handles partial matches (e.g., 'Adobe Creative Cloud' -> 'Adobe')
+    Injects tracking tags if the affiliate map has a brand match.
+    Handles partial matches (e.g., 'Adobe Creative Cloud' -> 'Adobe'); the
+    longest matching key wins. See intelligence/affiliate.py.
     """
     try:
-        # Load map - in production, cache this
-        map_path = os.path.join(os.path.dirname(__file__), AFFILIATE_MAP_PATH)
-        with open(map_path, 'r') as f:
-            aff_map = json.load(f)
-        
-        # Simple fuzzy match: check if key is in brand_name or vice versa
-        matched_key = None
-        for key in aff_map:
-            if key.lower() in brand_name.lower():
-                matched_key = key
-                break
-        
+        clean_link, matched_key = AFFILIATE.wrap(brand_name, raw_url)
         if matched_key:
-            data = aff_map[matched_key]
-            separator = "&" if "?" in raw_url else "?"
-            clean_link = f"{raw_url}{separator}{data['affiliate_param']}"
             print(f"[$] Affiliate Wrap: {brand_name} -> {clean_link}")
             return clean_link
-            
     except Exception as e:
         print(f"Wrapper Error: {e}")
     
     return raw_url # Return original if no match or error
 
-def process_pending_scans():
-    print("[*] Bridge started: Checking for pending scans...")
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    # Get scans that haven't been 'Brain-processed' yet
-    cursor.execute("SELECT id, raw_content, name, url, reputation_score FROM sites WHERE process_status = 'pending'")
-    pending = cursor.fetchall()
-    
-    if not pending:
-        print("[-] No pending scans found.")
-        conn.close()
+def is_quota_error(intel):
+    error = str(intel.get("error", "")).lower()
+    return any(marker in error for marker in QUOTA_MARKERS)
+
+def analyze_with_retry(content, site_name, url, store):
+    """
+    analyze_scan (delta-aware analyze_deal), retrying quota errors with exponential
+    backoff. Model calls inside it wait on the shared rate limiter. Returns None if
+    the quota never frees up.
+    """
+    for attempt in range(MAX_RETRIES + 1):
+        intel = analyze_scan(url or site_name, content, store, brand_hint=site_name)
+        if not is_quota_error(intel):
+            return intel
+        if attempt == MAX_RETRIES:
+            break
+        delay = BACKOFF_SECONDS * (2 ** attempt) + random.uniform(0, 1)
+        print(f"[!] Quota hit, backing off {delay:.1f}s (attempt {attempt + 1}/{MAX_RETRIES + 1})")
+        time.sleep(delay)
+    return None
+
+def prepare_db(conn):
+    """
+    WAL lets readers (the API) and several bridge workers share deals.db.
+    Brings older databases up to schema.sql (lease columns, indexes, deal search).
+    """
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA busy_timeout = 30000")
+    # Under the write lock, so workers starting together migrate exactly once
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        migrate(conn)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+def claim_batch(conn, worker_id, limit=CLAIM_BATCH, lease_seconds=LEASE_SECONDS):
+    """
+    Atomically leases up to `limit` pending rows (unleased or with an expired
+    lease) to this worker. BEGIN IMMEDIATE takes the write lock up front, so two
+    workers can never claim the same row.
+    """
+    now = time.time()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute("""
+            UPDATE sites SET lease_owner = ?, lease_expires = ?
+            WHERE id IN (
+                SELECT id FROM sites
+                WHERE process_status = 'pending' AND (lease_expires IS NULL OR lease_expires < ?)
+                ORDER BY id LIMIT ?
+            )
+        """, (worker_id, now + lease_seconds, now, limit))
+        rows = conn.execute("""
+            SELECT id, raw_content, name, url, reputation_score FROM sites
+            WHERE process_status = 'pending' AND lease_owner = ? ORDER BY id
+        """, (worker_id,)).fetchall()
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return rows
+
+def renew_leases(cursor, worker_id, lease_seconds=LEASE_SECONDS):
+    cursor.execute(
+        "UPDATE sites SET lease_expires = ? WHERE lease_owner = ? AND process_status = 'pending'",
+        (time.time() + lease_seconds, worker_id)
+    )
+
+def still_owned(cursor, site_id, worker_id):
+    cursor.execute("SELECT 1 FROM sites WHERE id = ? AND lease_owner = ? AND process_status = 'pending'", (site_id, worker_id))
+    return cursor.fetchone() is not None
+
+def release_lease(cursor, site_id, worker_id):
+    cursor.execute("UPDATE sites SET lease_owner = NULL, lease_expires = NULL WHERE id = ? AND lease_owner = ?", (site_id, worker_id))
+
+def commit_result(cursor, site_id, content, site_name, url, rep_score, intel, worker_id=WORKER_ID):
+    if not still_owned(cursor, site_id, worker_id):
+        # Our lease expired and another worker took the row: its result wins
+        print(f"[!] Lease lost on {site_name}, dropping result.")
         return
 
-    print(f"[*] Found {len(pending)} pending scans.")
-    
-    for site_id, content, site_name, url, rep_score in pending:
-        if not content:
-            cursor.execute("UPDATE sites SET process_status = 'failed' WHERE id = ?", (site_id,))
-            continue
-            
-        print(f"[*] Analyzing {site_name}...")
-        intel = analyze_deal(content)
+    if intel is None:
+        # Quota never freed up: leave the scan pending (and unleased) for the next run
+        print(f"[!] Gave up on {site_name} (quota). Left pending.")
+        release_lease(cursor, site_id, worker_id)
+        return
+
+    if intel.get("deal_found"):
+        # Calculate the Cyberhound Value Score
+        d = intel.get('discount_value', 0)
+        t = intel.get('duration_days', 0)
+        s = rep_score if rep_score else 1.0
+        if s == 0: s = 1.0
         
-        if intel.get("deal_found"):
-            # Calculate the Cyberhound Value Score
-            d = intel.get('discount_value', 0)
-            t = intel.get('duration_days', 0)
-            s = rep_score if rep_score else 1.0
-            if s == 0: s = 1.0
-            
-            v_score = (d * t) / s
-            
-            # THE GHOST LAYER: Wrap the link
-            final_url = wrap_affiliate_link(intel.get('brand', site_name), url)
-            
-            print(f"[+] Deal Found for {intel.get('brand', site_name)}! Score: {v_score}")
-            
-            # Save the refined deal to the 'deals' table
-            # Note: We need to store the affiliate link. 
-            # Ideally schema should have 'affiliate_url' or we overwrite 'code' or similar.
-            # Assuming we can store it in 'code' for now or need schema update.
-            # Let's add it to 'summary' or assume we append to DB. 
-            # Actually, `deals` table has `code`. Let's assume we use that or add `affiliate_link` column.
-            # For now, I'll print it. In a real update, I'd migrate the schema.
-            
-            cursor.execute("""
-                INSERT INTO deals (site_id, brand, value_score, summary, status, discount_amount, duration_months, raw_text)
-                VALUES (?, ?, ?, ?, 'active', ?, ?, ?)
-            """, (site_id, intel.get('brand', site_name), v_score, intel.get('summary', ''), d, t/30, content[:200]))
-            
-        else:
-            print(f"[-] No deal found for {site_name}.")
-            
-        # Mark the scan as processed
-        cursor.execute("UPDATE sites SET process_status = 'processed' WHERE id = ?", (site_id,))
-    
-    conn.commit()
+        v_score = (d * t) / s
+        
+        # THE GHOST LAYER: Wrap the link
+        final_url = wrap_affiliate_link(intel.get('brand', site_name), url)
+        
+        print(f"[+] Deal Found for {intel.get('brand', site_name)}! Score: {v_score}")
+        
+        # Save the refined deal to the 'deals' table
+        # Note: We need to store the affiliate link. 
+        # Ideally schema should have 'affiliate_url' or we overwrite 'code' or similar.
+        # Assuming we can store it in 'code' for now or need schema update.
+        # Let's add it to 'summary' or assume we append to DB. 
+        # Actually, `deals` table has `code`. Let's assume we use that or add `affiliate_link` column.
+        # For now, I'll print it. In a real update, I'd migrate the schema.
+        
+        cursor.execute("""
+            INSERT INTO deals (site_id, brand, value_score, summary, status, discount_amount, duration_months, raw_text)
+            VALUES (?, ?, ?, ?, 'active', ?, ?, ?)
+        """, (site_id, intel.get('brand', site_name), v_score, intel.get('summary', ''), d, t/30, content[:200]))
+        
+    else:
+        print(f"[-] No deal found for {site_name}.")
+        
+    # Mark the scan as processed
+    cursor.execute("UPDATE sites SET process_status = 'processed', lease_owner = NULL, lease_expires = NULL WHERE id = ?", (site_id,))
+
+def process_pending_scans(concurrency=CONCURRENCY, worker_id=WORKER_ID, rpm=LLM_RPM, tpm=LLM_TPM):
+    """
+    Claims pending scans in leased batches until none are left, analyzing each
+    batch with up to `concurrency` model calls in flight (bounded by an rpm/tpm
+    limiter, charged in processor.ask_model). Results are committed in scan order
+    every COMMIT_EVERY rows, which also renews the lease on the rest of the batch.
+    Safe to run as N processes, each given its share of the quota (run_workers).
+    """
+    print(f"[*] Bridge worker {worker_id} started: Checking for pending scans...")
+    set_rate_limiter(RateLimiter(rpm, tpm))
+    conn = sqlite3.connect(DB_PATH, timeout=30)
+    prepare_db(conn)
+    cursor = conn.cursor()
+
+    # Previous text + intel per target, for delta-only analysis
+    store = SQLiteStateStore(DB_PATH)
+    processed = 0
+    quota_exhausted = False
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        while True:
+            pending = claim_batch(conn, worker_id)
+            if not pending:
+                break
+            print(f"[*] {worker_id} claimed {len(pending)} scans. Analyzing with {concurrency} in flight...")
+
+            futures = [pool.submit(analyze_with_retry, row[1], row[2], row[3], store) if row[1] else None for row in pending]
+
+            # Wait for a whole chunk before writing: the write lock is never held
+            # while model calls are in flight (other workers need it to claim)
+            for start in range(0, len(pending), COMMIT_EVERY):
+                chunk = list(zip(pending, futures))[start:start + COMMIT_EVERY]
+                results = [future.result() if future else None for _, future in chunk]
+
+                conn.execute("BEGIN IMMEDIATE")
+                for ((site_id, content, site_name, url, rep_score), future), intel in zip(chunk, results):
+                    if future is None:
+                        if still_owned(cursor, site_id, worker_id):
+                            cursor.execute("UPDATE sites SET process_status = 'failed', lease_owner = NULL, lease_expires = NULL WHERE id = ?", (site_id,))
+                    else:
+                        print(f"[*] Analyzed {site_name}...")
+                        quota_exhausted = quota_exhausted or intel is None
+                        commit_result(cursor, site_id, content, site_name, url, rep_score, intel, worker_id)
+                renew_leases(cursor, worker_id)
+                conn.commit()
+            processed += len(pending)
+            if quota_exhausted:
+                # Released rows would be re-claimed right away: stop until the quota frees up
+                print(f"[!] {worker_id} stopping early: LLM quota exhausted.")
+                break
+
+    if not processed:
+        print("[-] No pending scans found.")
+    elif CACHE:
+        stats = CACHE.stats()
+        print(f"[*] LLM cache: {stats['hits']} hits, {stats['misses']} misses ({stats['hit_rate']:.0%}), {stats['entries']} entries")
+    conn.close()
+    print(f"[*] Bridge worker {worker_id} complete ({processed} scans).")
+
+def run_workers(count, concurrency=CONCURRENCY):
+    """
+    Drains the backlog with `count` bridge processes sharing deals.db. Each process
+    has its own limiter, so the API quota is split evenly between them.
+    """
+    conn = sqlite3.connect(DB_PATH, timeout=30)
+    prepare_db(conn)
     conn.close()
-    print("[*] Bridge processing complete.")
 
+    rpm, tpm = max(1, LLM_RPM // count), max(1, LLM_TPM // count)
+    print(f"[*] Starting {count} bridge workers at {rpm} req/min, {tpm} tokens/min each")
+    workers = [
+        multiprocessing.Process(target=process_pending_scans, args=(concurrency, f"{WORKER_ID}-w{i}", rpm, tpm))
+        for i in range(count)
+    ]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+
+# Usage: python bridge.py [workers]
 if __name__ == "__main__":
-    process_pending_scans()
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else 1
+    if workers > 1:
+        run_workers(workers)
+    else:
+        process_pending_scans()
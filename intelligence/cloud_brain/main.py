@@ -1,23 +1,28 @@
 import functions_framework
 from google.cloud import storage
+from google.api_core.exceptions import PreconditionFailed
 import vertexai
 from vertexai.generative_models import GenerativeModel
 import json
 import os
+import sys
 import datetime
+import random
+import time
+
+# Shared intelligence modules: staged next to this file at deploy time,
+# found in the parent 'intelligence' dir when running from the repo.
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from llm_cache import LLMCache, prompt_version
+from text_filter import reduce_text
+from fast_path import extract_deal, record_fixture, FAST_PATH_THRESHOLD, FIXTURES_PATH
+from affiliate import MATCHER as AFFILIATE
+from delta import DELTA_PROMPT_TEMPLATE, to_lines, plan_delta, delta_prompt, merge_intel
 
 # Initialization
 PROJECT_ID = os.environ.get("GCP_PROJECT")
 LOCATION = "us-central1"
 
-# Affiliate Map (Hardcoded or loaded from file for Cloud Function)
-AFFILIATE_MAP = {
-  "Shopify": { "base_url": "shopify.com", "affiliate_param": "ref=cyberhound_hq" },
-  "Adobe": { "base_url": "adobe.com", "affiliate_param": "mv=affiliate&mv2=cyberhound_hq" },
-  "DigitalOcean": { "base_url": "digitalocean.com", "affiliate_param": "refid=cyberhound_node" },
-  "NordVPN": { "base_url": "nordvpn.com", "affiliate_param": "coupon=cyberhound" }
-}
-
 try:
     if PROJECT_ID:
         vertexai.init(project=PROJECT_ID, location=LOCATION)
@@ -29,27 +34,137 @@ except Exception:
 
 storage_client = storage.Client()
 
+HOT_LIST_SIZE = 20
+HOT_LIST_RETRIES = 25
+
+def push_hot_list(bucket, new_deal):
+    """
+    Prepends a deal to latest_deals.json without losing concurrent updates:
+    read + generation, write with if_generation_match, retry on conflict.
+    """
+    for attempt in range(HOT_LIST_RETRIES):
+        deals_blob = bucket.get_blob("latest_deals.json")
+        generation = deals_blob.generation if deals_blob else 0
+
+        current_deals = []
+        if deals_blob:
+            try:
+                current_deals = json.loads(deals_blob.download_as_text(if_generation_match=generation))
+                if not isinstance(current_deals, list): current_deals = []
+            except PreconditionFailed:
+                continue # Changed under us, re-read
+            except ValueError:
+                pass
+
+        current_deals.insert(0, new_deal)
+        out_blob = bucket.blob("latest_deals.json")
+        out_blob.cache_control = 'no-cache'
+        try:
+            out_blob.upload_from_string(json.dumps(current_deals[:HOT_LIST_SIZE], indent=2), content_type='application/json', if_generation_match=generation)
+            return True
+        except PreconditionFailed:
+            time.sleep(random.uniform(0, 0.01 * (2 ** min(attempt, 6))))
+
+    print(f"Hot list update lost after {HOT_LIST_RETRIES} contended attempts")
+    return False
+
 def wrap_link(brand_name, raw_url):
-    for key, data in AFFILIATE_MAP.items():
-        if key.lower() in brand_name.lower():
-            separator = "&" if "?" in raw_url else "?"
-            return f"{raw_url}{separator}{data['affiliate_param']}"
-    return raw_url
+    # Same compiled matcher and affiliate_map.json as the bridge
+    return AFFILIATE.wrap(brand_name, raw_url)[0]
 
-def analyze_content(raw_text):
-    if not model: return None
-        
-    prompt = f"""
+PROMPT_TEMPLATE = """
     Analyze the following text from a website and extract any active promotional deals.
-    TEXT: {raw_text[:15000]}
+    TEXT: {text}
     RETURN JSON ONLY: {{ "deal_found": bool, "brand": string, "discount_value": float, "duration_days": int, "summary": string }}
     """
+
+# Result cache lives in /tmp: shared by invocations on the same warm instance
+PROMPT_VERSION = prompt_version(PROMPT_TEMPLATE)
+try:
+    CACHE = LLMCache(path=os.environ.get("CYBERHOUND_LLM_CACHE", "/tmp/llm_cache.db"))
+except Exception:
+    CACHE = None
+
+def ask_model(prompt):
+    response = model.generate_content(prompt)
+    text_response = response.text.replace('```json', '').replace('```', '').strip()
+    return json.loads(text_response)
+
+def analyze_content(raw_text, brand_hint=None):
+    # Send only the most deal-relevant blocks, not the first 15k chars
+    text, stats = reduce_text(raw_text)
+
+    # Obvious deals never reach the model (unless recording fixtures to score the rules)
+    rules, confidence = extract_deal(text, brand_hint)
+    if confidence >= FAST_PATH_THRESHOLD and not FIXTURES_PATH:
+        return {**rules, "source": "rules", "confidence": confidence}
+
+    if stats["tokens_saved"]:
+        print(f"Pre-filter saved {stats['tokens_saved']} of {stats['tokens_in']} tokens")
+    cache_key = LLMCache.key(PROMPT_VERSION, text)
+    if CACHE and not FIXTURES_PATH:
+        cached = CACHE.get(cache_key)
+        if cached is not None: return cached
+
+    if not model: return None
+        
     try:
-        response = model.generate_content(prompt)
-        text = response.text.replace('```json', '').replace('```', '').strip()
-        return json.loads(text)
+        intel = ask_model(PROMPT_TEMPLATE.format(text=text))
+        if CACHE: CACHE.put(cache_key, intel)
+        record_fixture(text, brand_hint, intel, rules, confidence)
+        return intel
     except: return None
 
+# Delta analysis state: previous lines + intel per target, under state/ (not raw/,
+# so writing it never re-triggers this function)
+DELTA_PROMPT_VERSION = prompt_version(DELTA_PROMPT_TEMPLATE)
+
+def load_state(bucket, target):
+    blob = bucket.get_blob(f"state/{target}.json")
+    if not blob: return None
+    try:
+        return json.loads(blob.download_as_text())
+    except ValueError:
+        return None
+
+def save_state(bucket, target, lines, intel):
+    blob = bucket.blob(f"state/{target}.json")
+    blob.upload_from_string(json.dumps({"lines": lines, "intel": intel}), content_type='application/json')
+
+def analyze_scan(bucket, target, raw_text, brand_hint=None):
+    """
+    Re-scans of a known page only send the changed lines; unchanged pages cost nothing.
+    """
+    lines = to_lines(raw_text)
+    previous = load_state(bucket, target)
+    mode, added, removed = plan_delta(previous, lines)
+
+    if mode == "unchanged":
+        print(f"Delta: {target} unchanged, reusing stored intel")
+        return previous["intel"]
+
+    intel = None
+    if mode == "delta" and model:
+        prompt = delta_prompt(previous["intel"], added, removed)
+        cache_key = LLMCache.key(DELTA_PROMPT_VERSION, prompt)
+        update = CACHE.get(cache_key) if CACHE else None
+        if update is None:
+            try:
+                update = ask_model(prompt)
+                if CACHE: CACHE.put(cache_key, update)
+            except Exception as e:
+                print(f"Delta analysis failed for {target}, running full analysis: {e}")
+        if update is not None:
+            intel = merge_intel(previous["intel"], update)
+            print(f"Delta: {target} sent {len(added) + len(removed)} changed lines")
+
+    if intel is None:
+        intel = analyze_content(raw_text, brand_hint)
+
+    if intel:
+        save_state(bucket, target, lines, intel)
+    return intel
+
 @functions_framework.cloud_event
 def process_new_scan(cloud_event):
     data = cloud_event.data
@@ -69,7 +184,7 @@ def process_new_scan(cloud_event):
         target_url = scan_data.get("url", "") # We need this from scanner
         
         # 1. Brain Analysis
-        intel = analyze_content(raw_text)
+        intel = analyze_scan(bucket, target_name, raw_text, target_name)
         
         if intel and intel.get("deal_found"):
             brand = intel.get("brand", target_name)
@@ -93,22 +208,15 @@ def process_new_scan(cloud_event):
                 "url": monetized_url # THE MONEY LINK
             }
             
-            # 4. Update Hot List
-            deals_blob = bucket.blob("latest_deals.json")
+            # 4. Update Hot List (compare-and-swap, safe with parallel invocations)
             details_blob = bucket.blob(f"processed/{new_deal['id']}.json") # Save individual record
-            
-            current_deals = []
-            if deals_blob.exists():
-                try: current_deals = json.loads(deals_blob.download_as_text())
-                except: pass
-            
-            current_deals.insert(0, new_deal)
-            current_deals = current_deals[:20]
-            
-            deals_blob.upload_from_string(json.dumps(current_deals, indent=2), content_type='application/json', cache_control='no-cache')
             details_blob.upload_from_string(json.dumps(new_deal, indent=2), content_type='application/json')
+            push_hot_list(bucket, new_deal)
             
             print(f"Deal processed and monetized for {brand}")
             
     except Exception as e:
         print(f"Error processing: {e}")
+    finally:
+        # Counters cover every invocation on this warm instance
+        if CACHE: print(f"LLM cache: {CACHE.stats()}")
@@ -0,0 +1,123 @@
+import difflib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# DELTA ANALYSIS
+# Keep each target's previous normalized text (as lines) and its last extracted
+# intel. When the page changes, diff line by line and ask the model only how the
+# changed lines affect the stored intel, instead of re-reading the whole page.
+# Shared by the bridge (processor.py) and the cloud brain (stage it next to main.py).
+
+# Configuration
+# Above this share of changed text a full analysis is cheaper and safer
+DELTA_MAX_RATIO = float(os.environ.get("CYBERHOUND_DELTA_MAX_RATIO", "0.4"))
+DELTA_MAX_CHARS = 6000
+
+DELTA_PROMPT_TEMPLATE = """
+    You are the Cyberhound Intelligence Engine.
+    You previously analyzed a website and extracted these findings:
+    {previous}
+
+    The page has since changed. Only the lines below were edited.
+    REMOVED LINES:
+    {removed}
+
+    ADDED LINES:
+    {added}
+
+    Update the findings to reflect the edit. Keep any field the edit does not affect.
+    If the deal is gone and no new one appears, set "deal_found" to false.
+
+    RETURN JSON ONLY (No markdown formatting):
+    {{
+      "deal_found": bool,
+      "brand": string,
+      "discount_value": float,
+      "duration_days": int,
+      "summary": string
+    }}
+    """
+
+
+def to_lines(text):
+    lines = (" ".join(line.split()) for line in (text or "").splitlines())
+    return [line for line in lines if line]
+
+def diff_lines(old_lines, new_lines):
+    """
+    Returns (added, removed) lines between two versions of a page.
+    """
+    added, removed = [], []
+    matcher = difflib.SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag in ("replace", "delete"):
+            removed.extend(old_lines[i1:i2])
+        if tag in ("replace", "insert"):
+            added.extend(new_lines[j1:j2])
+    return added, removed
+
+def plan_delta(previous, new_lines):
+    """
+    Decides how to analyze a scan given the stored state:
+    ("unchanged", [], []), ("delta", added, removed) or ("full", [], []).
+    """
+    if not previous or not previous.get("intel"):
+        return "full", [], []
+    added, removed = diff_lines(previous["lines"], new_lines)
+    if not added and not removed:
+        return "unchanged", [], []
+    changed = sum(map(len, added)) + sum(map(len, removed))
+    total = max(1, sum(map(len, new_lines)))
+    if changed / total > DELTA_MAX_RATIO or changed > DELTA_MAX_CHARS:
+        return "full", [], []
+    return "delta", added, removed
+
+def delta_prompt(previous_intel, added, removed):
+    findings = {k: previous_intel.get(k) for k in ("deal_found", "brand", "discount_value", "duration_days", "summary")}
+    return DELTA_PROMPT_TEMPLATE.format(
+        previous=json.dumps(findings),
+        removed="\n".join(removed) or "(none)",
+        added="\n".join(added) or "(none)"
+    )
+
+def merge_intel(previous_intel, update):
+    merged = dict(previous_intel)
+    merged.update({k: v for k, v in update.items() if v is not None})
+    return merged
+
+
+class SQLiteStateStore:
+    """
+    Per-target analysis state in a SQLite table (the bridge keeps it in deals.db).
+    """
+
+    def __init__(self, path):
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS brain_state (
+                target TEXT PRIMARY KEY,
+                lines TEXT NOT NULL,
+                intel TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
+        self.conn.commit()
+
+    def get(self, target):
+        with self._lock:
+            row = self.conn.execute("SELECT lines, intel FROM brain_state WHERE target = ?", (target,)).fetchone()
+        if not row:
+            return None
+        return {"lines": json.loads(row[0]), "intel": json.loads(row[1])}
+
+    def put(self, target, lines, intel):
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO brain_state (target, lines, intel, updated_at) VALUES (?, ?, ?, ?)",
+                (target, json.dumps(lines), json.dumps(intel), time.time())
+            )
+            self.conn.commit()
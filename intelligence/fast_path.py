@@ -0,0 +1,159 @@
+import json
+import os
+import re
+import sys
+
+# FAST PATH: deterministic deal extraction for the obvious cases
+# ("40% OFF", "$1/month for 3 months", "14-day free trial"). Emits the same
+# {deal_found, brand, discount_value, duration_days, summary} schema as the model
+# plus a confidence score; callers only escalate to the LLM below FAST_PATH_THRESHOLD.
+# Shared by the bridge (processor.py) and the cloud brain (stage it next to main.py).
+
+# Configuration
+FAST_PATH_THRESHOLD = float(os.environ.get("CYBERHOUND_FAST_PATH_THRESHOLD", "0.8"))
+# When set, every page goes to the model (fast path and cache bypassed) and is
+# appended here as a fixture: {"text", "brand", "model", "rules", "confidence"}
+FIXTURES_PATH = os.environ.get("CYBERHOUND_RECORD_FIXTURES")
+# Answers that need a guess (duration, which of several offers) stay below the threshold
+GUESS_CONFIDENCE = min(0.7, FAST_PATH_THRESHOLD - 0.05)
+
+WORD_NUMBERS = {"one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7,
+                "eight": 8, "nine": 9, "ten": 10, "twelve": 12, "fourteen": 14, "thirty": 30}
+UNIT_DAYS = {"day": 1, "week": 7, "month": 30, "year": 365}
+
+NUM = r"\b(\d+|" + "|".join(WORD_NUMBERS) + r")"
+UNIT = r"(day|week|month|year)s?"
+PRICE = r"[$€£]\s?(\d+(?:[.,]\d{1,2})?)"
+PER_MONTH = r"\s?(?:/|per\s|a\s)\s?(?:mo|month)\b"
+PERCENT = r"(?<![\w.])(100|\d{1,2}(?:\.\d+)?)\s?%"
+
+PERCENT_OFF = re.compile(r"(?:save\s+|up\s+to\s+)?" + PERCENT + r"\s?(?:off|discount|savings?)\b|\bsave\s+" + PERCENT, re.IGNORECASE)
+FREE_TRIAL = re.compile(NUM + r"[-\s]" + UNIT + r"\s+free\s+trial|free\s+(?:trial\s+)?for\s+" + NUM + r"\s+" + UNIT, re.IGNORECASE)
+INTRO_PRICE = re.compile(PRICE + PER_MONTH + r"\s+for\s+(?:the\s+first\s+|your\s+first\s+)?" + NUM + r"\s+months?", re.IGNORECASE)
+REGULAR_PRICE = re.compile(r"(?:then|regularly|normally|was)\s+" + PRICE, re.IGNORECASE)
+DURATION = re.compile(r"\bfor\s+(?:the\s+first\s+|your\s+first\s+)?" + NUM + r"\s+" + UNIT, re.IGNORECASE)
+FIRST_YEAR = re.compile(r"\bfirst\s+year\b", re.IGNORECASE)
+
+
+def _num(token):
+    token = token.lower()
+    return WORD_NUMBERS[token] if token in WORD_NUMBERS else int(token)
+
+def _price(token):
+    return float(token.replace(",", "."))
+
+def _no_deal(brand, confidence):
+    return {"deal_found": False, "brand": brand, "discount_value": 0.0, "duration_days": 0, "summary": ""}, confidence
+
+def extract_deal(text, brand_hint=None):
+    """
+    Returns (intel, confidence in [0, 1]).
+    Low confidence means "ask the model", including every page with no clear signal
+    and every page where several offers compete (trial + intro price, two trials...).
+    """
+    brand = brand_hint or "Unknown"
+    text = text or ""
+
+    trials = FREE_TRIAL.findall(text)
+    intro = INTRO_PRICE.search(text)
+    percents = [float(a or b) for a, b in PERCENT_OFF.findall(text)]
+
+    # Distinct deal signals on the page: only a lone one is "obvious"
+    signals = len({(g[0] or g[2], g[1] or g[3]) for g in trials}) + bool(intro) + len(set(percents))
+    competing = signals > 1
+
+    # 1. Free trials: "14-day free trial", "free for 30 days"
+    if trials:
+        g = trials[0]
+        count, unit = (g[0], g[1]) if g[0] else (g[2], g[3])
+        days = _num(count) * UNIT_DAYS[unit.lower()]
+        return {
+            "deal_found": True,
+            "brand": brand,
+            "discount_value": 100.0,
+            "duration_days": days,
+            "summary": f"{brand} offers a {days}-day free trial."
+        }, GUESS_CONFIDENCE if competing else 0.9
+
+    # 2. Intro pricing: "$1/month for 3 months" (discount needs the regular price)
+    if intro:
+        intro_price, months = _price(intro.group(1)), _num(intro.group(2))
+        regular = REGULAR_PRICE.search(text, intro.end(), intro.end() + 120)
+        discount, confidence = 0.0, 0.6
+        if regular and _price(regular.group(1)) > intro_price:
+            discount = round((1 - intro_price / _price(regular.group(1))) * 100, 1)
+            confidence = 0.85
+        return {
+            "deal_found": True,
+            "brand": brand,
+            "discount_value": discount,
+            "duration_days": months * 30,
+            "summary": f"{brand} is ${intro_price:g}/month for the first {months} months."
+        }, min(confidence, GUESS_CONFIDENCE) if competing else confidence
+
+    # 3. Percentage off: "40% OFF", "save 20%"
+    if percents:
+        discount = max(percents)
+        confidence = GUESS_CONFIDENCE if competing else 0.9
+        duration = DURATION.search(text)
+        if duration:
+            days = _num(duration.group(1)) * UNIT_DAYS[duration.group(2).lower()]
+        elif FIRST_YEAR.search(text):
+            days = 365
+        else:
+            days = 30  # Same default the model prompt uses
+            confidence = min(confidence, GUESS_CONFIDENCE)  # A guess: let the model confirm
+        return {
+            "deal_found": True,
+            "brand": brand,
+            "discount_value": discount,
+            "duration_days": days,
+            "summary": f"{brand} is {discount:g}% off for {days} days."
+        }, round(confidence, 2)
+
+    # No signal the rules understand: not confident either way
+    return _no_deal(brand, 0.3)
+
+def record_fixture(text, brand, model_intel, rules_intel=None, confidence=None):
+    if not FIXTURES_PATH:
+        return
+    try:
+        with open(FIXTURES_PATH, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"text": text, "brand": brand, "model": model_intel,
+                                "rules": rules_intel, "confidence": confidence}) + "\n")
+    except Exception as e:
+        print(f"[!] Could not record fixture: {e}")
+
+def agrees(rules, model):
+    if bool(rules.get("deal_found")) != bool(model.get("deal_found")):
+        return False
+    if not model.get("deal_found"):
+        return True
+    return (abs(float(rules.get("discount_value", 0)) - float(model.get("discount_value", 0) or 0)) <= 1.0
+            and abs(int(rules.get("duration_days", 0)) - int(model.get("duration_days", 0) or 0)) <= 1)
+
+def measure_agreement(fixtures, threshold=FAST_PATH_THRESHOLD):
+    """
+    Replays recorded model answers against the fast path.
+    coverage: share of fixtures the fast path would answer on its own;
+    agreement: share of those answers matching the model (discount +-1, duration +-1 day).
+    """
+    total = covered = agreed = 0
+    for fixture in fixtures:
+        total += 1
+        intel, confidence = extract_deal(fixture["text"], fixture.get("brand"))
+        if confidence < threshold:
+            continue
+        covered += 1
+        agreed += agrees(intel, fixture["model"])
+    return {
+        "fixtures": total,
+        "coverage": round(covered / total, 3) if total else 0.0,
+        "agreement": round(agreed / covered, 3) if covered else 0.0
+    }
+
+# Usage: python fast_path.py fixtures.ndjson
+#        python fast_path.py fast_path_fixtures.ndjson   (hand-labelled regression cases)
+if __name__ == "__main__":
+    with open(sys.argv[1], "r", encoding="utf-8") as f:
+        print(measure_agreement(json.loads(line) for line in f if line.strip()))
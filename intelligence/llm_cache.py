@@ -0,0 +1,100 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# LLM RESULT CACHE
+# Keyed by hash(prompt template version + normalized text): re-scanned pages with
+# the same copy never pay for a second Gemini call. Backed by a local SQLite file
+# with TTL and size-based (least recently hit) eviction.
+# Shared by the bridge (processor.py) and the cloud brain (stage it next to main.py).
+
+# Configuration
+CACHE_PATH = os.environ.get("CYBERHOUND_LLM_CACHE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "llm_cache.db"))
+CACHE_TTL_SECONDS = int(os.environ.get("CYBERHOUND_LLM_CACHE_TTL", str(7 * 24 * 3600)))
+CACHE_MAX_ENTRIES = int(os.environ.get("CYBERHOUND_LLM_CACHE_MAX", "5000"))
+
+
+def prompt_version(template):
+    """
+    Short fingerprint of a prompt template: editing the prompt invalidates old answers.
+    """
+    return hashlib.sha1(template.encode("utf-8")).hexdigest()[:12]
+
+def normalize_text(text):
+    return " ".join((text or "").split())
+
+
+class LLMCache:
+    def __init__(self, path=CACHE_PATH, ttl_seconds=CACHE_TTL_SECONDS, max_entries=CACHE_MAX_ENTRIES):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_hit REAL NOT NULL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_last_hit ON llm_cache(last_hit)")
+        self.conn.commit()
+
+    @staticmethod
+    def key(version, text):
+        return hashlib.sha256(f"{version}\n{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """
+        Returns the cached result (parsed JSON) or None on a miss / expired entry.
+        """
+        now = time.time()
+        with self._lock:
+            row = self.conn.execute("SELECT value, created_at FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row and now - row[1] <= self.ttl_seconds:
+                self.conn.execute("UPDATE llm_cache SET last_hit = ? WHERE key = ?", (now, key))
+                self.conn.commit()
+                self.hits += 1
+                return json.loads(row[0])
+            if row:
+                self.conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self.conn.commit()
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        now = time.time()
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, created_at, last_hit) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), now, now)
+            )
+            self._evict(now)
+            self.conn.commit()
+
+    def _evict(self, now):
+        self.conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (now - self.ttl_seconds,))
+        (count,) = self.conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()
+        if count > self.max_entries:
+            self.conn.execute(
+                "DELETE FROM llm_cache WHERE key IN (SELECT key FROM llm_cache ORDER BY last_hit ASC LIMIT ?)",
+                (count - self.max_entries,)
+            )
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        with self._lock:
+            (entries,) = self.conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "entries": entries
+        }
@@ -2,6 +2,10 @@ import os
 import json
 import vertexai
 from vertexai.generative_models import GenerativeModel
+from intelligence.llm_cache import LLMCache, prompt_version
+from intelligence.text_filter import reduce_text, CHARS_PER_TOKEN
+from intelligence.fast_path import extract_deal, record_fixture, FAST_PATH_THRESHOLD, FIXTURES_PATH
+from intelligence.delta import DELTA_PROMPT_TEMPLATE, to_lines, plan_delta, delta_prompt, merge_intel
 
 # Initialize Vertex AI
 # We use an environment variable for the project ID to keep it secure and flexible.
@@ -22,14 +26,7 @@ except Exception as e:
     print(f"Warning: Vertex AI init failed (expected during local dev if creds missing): {e}")
     model = None
 
-def analyze_deal(raw_text):
-    """
-    Takes raw website text and extracts structured deal intelligence.
-    """
-    if not model:
-        return {"deal_found": False, "error": "Vertex AI not initialized"}
-
-    prompt = f"""
+PROMPT_TEMPLATE = """
     You are the Cyberhound Intelligence Engine. 
     Analyze the following text from a website and extract any active promotional deals or trials.
     
@@ -40,7 +37,7 @@ def analyze_deal(raw_text):
     4. Provide a 1-sentence summary.
     
     TEXT TO ANALYZE:
-    {raw_text[:15000]} 
+    {text} 
     
     RETURN JSON ONLY (No markdown formatting):
     {{
@@ -51,17 +48,110 @@ def analyze_deal(raw_text):
       "summary": string
     }}
     """
-    
+
+# Persistent result cache: identical (prompt, text) pairs are answered locally
+PROMPT_VERSION = prompt_version(PROMPT_TEMPLATE)
+DELTA_PROMPT_VERSION = prompt_version(DELTA_PROMPT_TEMPLATE)
+try:
+    CACHE = LLMCache()
+except Exception as e:
+    print(f"Warning: LLM cache unavailable, every scan hits the model: {e}")
+    CACHE = None
+
+# Optional RPM/TPM limiter (rate_limiter.RateLimiter): only real model calls are
+# charged, never cache hits, fast-path answers or unchanged pages
+LIMITER = None
+
+def set_rate_limiter(limiter):
+    global LIMITER
+    LIMITER = limiter
+
+def analyze_deal(raw_text, brand_hint=None):
+    """
+    Takes raw website text and extracts structured deal intelligence.
+    Obvious deals are resolved by the rule-based fast path; otherwise only the
+    most deal-relevant blocks are sent (see text_filter), cache first.
+    While recording fixtures every page goes to the model, so the fast path
+    can be scored against it (fast_path.measure_agreement).
+    """
+    text, stats = reduce_text(raw_text)
+
+    rules, confidence = extract_deal(text, brand_hint)
+    if confidence >= FAST_PATH_THRESHOLD and not FIXTURES_PATH:
+        print(f"[*] Fast path ({confidence:.2f}): resolved without the model")
+        return {**rules, "source": "rules", "confidence": confidence}
+
+    if stats["tokens_saved"]:
+        print(f"[*] Pre-filter: {stats['tokens_in']} -> {stats['tokens_out']} tokens (saved {stats['tokens_saved']})")
+    cache_key = LLMCache.key(PROMPT_VERSION, text)
+    if CACHE and not FIXTURES_PATH:
+        cached = CACHE.get(cache_key)
+        if cached is not None:
+            return cached
+
     try:
-        response = model.generate_content(prompt)
-        text_response = response.text.strip()
-        # Clean up any potential markdown code blocks
-        if text_response.startswith("```json"):
-            text_response = text_response[7:]
-        if text_response.endswith("```"):
-            text_response = text_response[:-3]
-            
-        return json.loads(text_response)
+        intel = ask_model(PROMPT_TEMPLATE.format(text=text))
     except Exception as e:
         print(f"Error parsing AI response: {e}")
         return {"deal_found": False, "error": str(e)}
+
+    if CACHE:
+        CACHE.put(cache_key, intel)
+    record_fixture(text, brand_hint, intel, rules, confidence)
+    return intel
+
+def ask_model(prompt):
+    """
+    Sends a prompt to Gemini and returns the parsed JSON answer (raises on failure).
+    """
+    if not model:
+        raise RuntimeError("Vertex AI not initialized")
+
+    if LIMITER:
+        LIMITER.acquire(len(prompt) // CHARS_PER_TOKEN)
+    response = model.generate_content(prompt)
+    text_response = response.text.strip()
+    # Clean up any potential markdown code blocks
+    if text_response.startswith("```json"):
+        text_response = text_response[7:]
+    if text_response.endswith("```"):
+        text_response = text_response[:-3]
+        
+    return json.loads(text_response)
+
+def analyze_scan(target, raw_text, store, brand_hint=None):
+    """
+    analyze_deal, but delta-aware: `store` keeps each target's previous lines and
+    intel. Unchanged pages reuse the stored intel; small edits only send the
+    changed lines (plus the old findings) to the model and merge the answer.
+    """
+    lines = to_lines(raw_text)
+    previous = store.get(target)
+    mode, added, removed = plan_delta(previous, lines)
+
+    if mode == "unchanged":
+        print(f"[*] Delta: {target} unchanged, reusing stored intel")
+        return previous["intel"]
+
+    intel = None
+    if mode == "delta":
+        prompt = delta_prompt(previous["intel"], added, removed)
+        cache_key = LLMCache.key(DELTA_PROMPT_VERSION, prompt)
+        update = CACHE.get(cache_key) if CACHE else None
+        if update is None:
+            try:
+                update = ask_model(prompt)
+                if CACHE:
+                    CACHE.put(cache_key, update)
+            except Exception as e:
+                print(f"[!] Delta analysis failed for {target}, running full analysis: {e}")
+        if update is not None:
+            intel = merge_intel(previous["intel"], update)
+            print(f"[*] Delta: {target} sent {len(added) + len(removed)} changed lines (~{len(prompt) // 4} tokens)")
+
+    if intel is None:
+        intel = analyze_deal(raw_text, brand_hint)
+
+    if "error" not in intel:
+        store.put(target, lines, intel)
+    return intel
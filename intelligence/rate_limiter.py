@@ -0,0 +1,50 @@
+import threading
+import time
+from collections import deque
+
+# RATE LIMITER: requests-per-minute + tokens-per-minute sliding window.
+# Thread-safe; callers block in acquire() until the call fits in the quota.
+
+
+class RateLimiter:
+    def __init__(self, requests_per_minute, tokens_per_minute=None, window_seconds=60.0):
+        self.rpm = requests_per_minute
+        self.tpm = tokens_per_minute
+        self.window = window_seconds
+        self._calls = deque()  # (timestamp, tokens)
+        self._tokens = 0
+        self._lock = threading.Lock()
+
+    def _expire(self, now):
+        while self._calls and now - self._calls[0][0] >= self.window:
+            _, tokens = self._calls.popleft()
+            self._tokens -= tokens
+
+    def _wait_time(self, now, tokens):
+        if self.rpm and len(self._calls) >= self.rpm:
+            return self._calls[0][0] + self.window - now
+        if self.tpm and self._calls and self._tokens + tokens > self.tpm:
+            # Wait until enough of the oldest calls leave the window
+            freed = 0
+            for ts, t in self._calls:
+                freed += t
+                if self._tokens - freed + tokens <= self.tpm:
+                    return ts + self.window - now
+            return self._calls[-1][0] + self.window - now
+        return 0
+
+    def acquire(self, tokens=0):
+        """
+        Blocks until a call costing `tokens` fits in both quotas, then books it.
+        A single call larger than the token quota is let through on an empty window.
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._expire(now)
+                wait = self._wait_time(now, tokens)
+                if wait <= 0:
+                    self._calls.append((now, tokens))
+                    self._tokens += tokens
+                    return
+            time.sleep(min(wait, 1.0))
@@ -0,0 +1,99 @@
+import os
+import re
+
+# RELEVANCE PRE-FILTER
+# Page innerText is mostly navigation, cookie banners and footers. Instead of
+# blindly sending the first 15,000 chars, split the page into blocks, score each
+# for deal signals and send only the best blocks (in page order) up to a token budget.
+# Shared by the bridge (processor.py) and the cloud brain (stage it next to main.py).
+
+# Configuration
+TOKEN_BUDGET = int(os.environ.get("CYBERHOUND_PROMPT_TOKENS", "2500"))
+CHARS_PER_TOKEN = 4
+BLOCK_CHARS = 400
+
+# (pattern, weight): each hit counts, capped at 3 hits per pattern per block
+SIGNALS = [
+    (re.compile(r"[$€£¥]\s?\d|\d\s?(?:usd|eur|gbp)\b", re.IGNORECASE), 3.0),
+    (re.compile(r"\d+(?:\.\d+)?\s?%"), 3.0),
+    (re.compile(r"\bfree\s+trial\b|\btrial\b", re.IGNORECASE), 2.5),
+    (re.compile(r"\blifetime\b", re.IGNORECASE), 2.0),
+    (re.compile(r"\boff\b", re.IGNORECASE), 1.5),
+    (re.compile(r"\b(?:save|discount|promo|coupon|deal|sale|limited)\b", re.IGNORECASE), 1.5),
+    (re.compile(r"(?:/|\bper\s)\s?(?:mo|month|yr|year|user|seat)\b", re.IGNORECASE), 1.5),
+    (re.compile(r"\b(?:free|months?|days?|weeks?)\b", re.IGNORECASE), 0.5)
+]
+BOILERPLATE = re.compile(r"\b(?:cookies?|privacy policy|terms of (?:service|use)|all rights reserved|sign in|log in)\b", re.IGNORECASE)
+
+
+def estimate_tokens(text):
+    return len(text) // CHARS_PER_TOKEN
+
+def split_blocks(text):
+    """
+    Groups lines into blocks of about BLOCK_CHARS, breaking on blank lines.
+    Lines longer than BLOCK_CHARS (minified / SPA text) are cut into BLOCK_CHARS chunks.
+    """
+    blocks, current = [], []
+    size = 0
+    for line in text.splitlines():
+        line = line.strip()
+        if len(line) > BLOCK_CHARS:
+            if current:
+                blocks.append("\n".join(current))
+                current, size = [], 0
+            blocks.extend(line[i:i + BLOCK_CHARS] for i in range(0, len(line), BLOCK_CHARS))
+            continue
+        if not line:
+            if current:
+                blocks.append("\n".join(current))
+                current, size = [], 0
+            continue
+        current.append(line)
+        size += len(line)
+        if size >= BLOCK_CHARS:
+            blocks.append("\n".join(current))
+            current, size = [], 0
+    if current:
+        blocks.append("\n".join(current))
+    return blocks
+
+def score_block(block):
+    score = sum(weight * min(len(pattern.findall(block)), 3) for pattern, weight in SIGNALS)
+    if BOILERPLATE.search(block):
+        score *= 0.3
+    # Favour dense blocks: a price line beats a long paragraph with one "%"
+    return score / (1 + len(block) / 1000)
+
+def reduce_text(text, token_budget=TOKEN_BUDGET):
+    """
+    Returns (reduced_text, stats). Pages already under the budget pass through untouched.
+    The first block (usually the brand / page title) is always kept for context.
+    """
+    text = text or ""
+    tokens_in = estimate_tokens(text)
+    if tokens_in <= token_budget:
+        return text, {"tokens_in": tokens_in, "tokens_out": tokens_in, "tokens_saved": 0}
+
+    blocks = split_blocks(text)
+    ranked = sorted(range(1, len(blocks)), key=lambda i: score_block(blocks[i]), reverse=True)
+
+    keep, used = set(), 0
+    for i in [0] + ranked:
+        cost = estimate_tokens(blocks[i]) + 1
+        if used + cost > token_budget:
+            continue
+        if i and score_block(blocks[i]) <= 0:
+            break  # Only boilerplate left
+        keep.add(i)
+        used += cost
+
+    if not keep:
+        # Never lose the whole page: fall back to a plain head cut
+        reduced = text[:token_budget * CHARS_PER_TOKEN]
+        tokens_out = estimate_tokens(reduced)
+        return reduced, {"tokens_in": tokens_in, "tokens_out": tokens_out, "tokens_saved": tokens_in - tokens_out}
+
+    reduced = "\n\n".join(blocks[i] for i in sorted(keep))
+    tokens_out = estimate_tokens(reduced)
+    return reduced, {"tokens_in": tokens_in, "tokens_out": tokens_out, "tokens_saved": tokens_in - tokens_out}
@@ -1,89 +1,422 @@
 import os
+import sys
 import json
-import vertexai
-from vertexai.preview.vision import VideoGenerationModel
-from vertexai.generative_models import GenerativeModel
+import time
+import socket
+import hashlib
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Add parent dir to path to find intelligence module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from intelligence.llm_cache import LLMCache, prompt_version
 
 # Logic:
 # 1. Receive Deal Data (High Value Score > 100)
 # 2. Gemini 1.5 Flash updates the "Creative Directive" (Prompt)
 # 3. Veo (VideoGenerationModel) creates the MP4
 # 4. Save to 'media/videos/' for upload
+#
+# Renders are expensive and slow, so callers queue them (queue_ad) and a
+# worker pool drains the queue (run_render_workers). The queue is a local
+# SQLite file: one job per (deal id, design brief), resumed after a restart.
 
 PROJECT_ID = os.environ.get("GCP_PROJECT")
 LOCATION = "us-central1"
 
-def create_cinematic_ad(deal):
-    """
-    Orchestrates the creation of a video ad for a high-value deal.
-    """
-    if not PROJECT_ID:
-        print("[-] GCP_PROJECT not set. Cannot run Video Engine.")
-        return None
+QUEUE_PATH = os.environ.get("VIDEO_QUEUE_DB", os.path.join(os.path.dirname(os.path.abspath(__file__)), "render_queue.db"))
+RENDER_CONCURRENCY = int(os.environ.get("VIDEO_RENDER_CONCURRENCY", "2"))
+RENDER_LEASE_SECONDS = int(os.environ.get("VIDEO_RENDER_LEASE_SECONDS", "1800"))
+MAX_ATTEMPTS = 3
+OUTPUT_DIR = os.path.join("media", "videos")
 
-    vertexai.init(project=PROJECT_ID, location=LOCATION)
-    
-    # 1. The Creative Director (Gemini)
-    creative_brain = GenerativeModel("gemini-1.5-flash-001")
-    
-    brand = deal.get("brand", "Unknown")
-    discount = deal.get("discount_amount", "Special")
-    summary = deal.get("summary", "")
-    
-    design_brief = f"""
+DESIGN_BRIEF_TEMPLATE = """
     You are a world-class Sci-Fi Visual Director.
     Create a 1-sentence, highly visual AI video prompt for Google Veo.
-    
+
     SUBJECT: {brand}
     OFFER: {discount} discount
     CONTEXT: {summary}
     STYLE: Cyberpunk, Neon-Noir, Cinematic, 8k, Unreal Engine 5 render.
-    
-    The video should NOT have text overlay (we add that later). 
-    Focus on the visual metaphor of the brand. 
-    Examples: 
+
+    The video should NOT have text overlay (we add that later).
+    Focus on the visual metaphor of the brand.
+    Examples:
     - "A glowing neon Shopify bag floating in a rainy cyber-city."
     - "A high-speed digital tunnel forming the Adobe logo."
-    
+
     OUTPUT: Just the prompt text.
     """
-    
+BRIEF_VERSION = prompt_version(DESIGN_BRIEF_TEMPLATE)
+
+# Creative directives are cached like deal analyses: same brief, no second Gemini call
+try:
+    DIRECTIVE_CACHE = LLMCache()
+except Exception as e:
+    print(f"[!] Directive cache unavailable: {e}")
+    DIRECTIVE_CACHE = None
+
+_vertex_ready = False
+_vertex_lock = threading.Lock()
+
+def init_vertex():
+    """
+    vertexai.init once per process (it used to run on every render).
+    """
+    global _vertex_ready
+    with _vertex_lock:
+        if not _vertex_ready:
+            import vertexai
+            vertexai.init(project=PROJECT_ID, location=LOCATION)
+            _vertex_ready = True
+
+def design_brief(deal):
+    return DESIGN_BRIEF_TEMPLATE.format(
+        brand=deal.get("brand", "Unknown"),
+        discount=deal.get("discount_amount", "Special"),
+        summary=deal.get("summary", "")
+    )
+
+def gemini_director(brief):
+    from vertexai.generative_models import GenerativeModel
+    init_vertex()
+    response = GenerativeModel("gemini-1.5-flash-001").generate_content(brief)
+    return response.text.strip()
+
+def load_veo_model():
+    from vertexai.preview.vision import VideoGenerationModel
+    init_vertex()
+    # Note: Model name subject to change (e.g., 'veo-001' or 'video-generation-001')
+    return VideoGenerationModel.from_pretrained("video-generation-001")
+
+class StubVideoModel:
+    """
+    Stands in for Veo (same generate_video / videos[0].save shape): writes a
+    small placeholder file instead of rendering. For tests and dry runs.
+    """
+
+    def __init__(self, delay_seconds=0.0):
+        self.delay_seconds = delay_seconds
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    class _Video:
+        def __init__(self, prompt):
+            self.prompt = prompt
+
+        def save(self, path):
+            with open(path, "w") as f:
+                f.write(f"STUB VIDEO\n{self.prompt}\n")
+
+    class _Response:
+        def __init__(self, videos):
+            self.videos = videos
+
+    def generate_video(self, prompt, number_of_videos=1):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.delay_seconds)
+        return self._Response([self._Video(prompt) for _ in range(number_of_videos)])
+
+def creative_directive(deal, director=None):
+    """
+    Gemini's Veo prompt for a deal, from the directive cache when the brief was seen before.
+    Only Gemini's answers are cached: an injected (stub) director never pollutes it.
+    """
+    brief = design_brief(deal)
+    if director:
+        return director(brief)
+
+    cache_key = LLMCache.key(BRIEF_VERSION, brief)
+    if DIRECTIVE_CACHE:
+        cached = DIRECTIVE_CACHE.get(cache_key)
+        if cached is not None:
+            return cached
+    veo_prompt = gemini_director(brief)
+    if DIRECTIVE_CACHE:
+        DIRECTIVE_CACHE.put(cache_key, veo_prompt)
+    return veo_prompt
+
+def create_cinematic_ad(deal, video_model=None, director=None):
+    """
+    Orchestrates the creation of a video ad for a high-value deal.
+    Runs in the caller; prefer queue_ad() so renders are deduplicated and survive restarts.
+    """
+    if not PROJECT_ID and video_model is None:
+        print("[-] GCP_PROJECT not set. Cannot run Video Engine.")
+        return None
+
+    brand = deal.get("brand", "Unknown")
+
+    # 1. The Creative Director (Gemini)
     try:
-        response = creative_brain.generate_content(design_brief)
-        veo_prompt = response.text.strip()
+        veo_prompt = creative_directive(deal, director)
         print(f"[*] Creative Directive: {veo_prompt}")
-        
+
     except Exception as e:
         print(f"[-] Creative Director Failed: {e}")
         return None
 
     # 2. The Production Studio (Veo)
     try:
-        # Note: Model name subject to change (e.g., 'veo-001' or 'video-generation-001')
         print("[*] Rolling Camera (Veo)...")
-        veo_model = VideoGenerationModel.from_pretrained("video-generation-001") 
-        
+        veo_model = video_model or load_veo_model()
+
         video_response = veo_model.generate_video(
             prompt=veo_prompt,
             number_of_videos=1
         )
-        
+
         video = video_response.videos[0]
-        
+
         # Save output
         filename = f"ad_{deal['id']}_{brand}.mp4"
-        output_path = os.path.join("media", "videos", filename)
+        output_path = os.path.join(OUTPUT_DIR, filename)
         os.makedirs(os.path.dirname(output_path), exist_ok=True)
-        
+
         video.save(output_path)
         print(f"[+] CUT! Video saved to {output_path}")
         return output_path
-        
+
     except Exception as e:
         print(f"[-] Production Failed: {e}")
         return None
 
+
+class RenderQueue:
+    """
+    Durable render jobs in SQLite. A job is unique per (deal id, design brief):
+    re-queuing the same deal is a no-op, and a finished render is never redone.
+    Highest value_score renders first. Running jobs carry a lease; if the
+    worker dies, the job is picked up again after a restart (same host) or
+    once the lease expires.
+    """
+
+    def __init__(self, path=QUEUE_PATH, lease_seconds=RENDER_LEASE_SECONDS, max_attempts=MAX_ATTEMPTS):
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.owner = f"{socket.gethostname()}-{os.getpid()}"
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS render_jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                deal_id TEXT NOT NULL,
+                brief_hash TEXT NOT NULL,
+                deal TEXT NOT NULL,
+                priority REAL NOT NULL DEFAULT 0,
+                status TEXT NOT NULL DEFAULT 'queued', -- queued, running, done, failed
+                attempts INTEGER NOT NULL DEFAULT 0,
+                owner TEXT,
+                lease_expires REAL,
+                output_path TEXT,
+                error TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                UNIQUE(deal_id, brief_hash)
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_render_jobs_next ON render_jobs(status, priority DESC, id)")
+        self.reclaim_orphans()
+
+    def _write(self, fn):
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = fn()
+                self.conn.execute("COMMIT")
+                return result
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+
+    def enqueue(self, deal):
+        """
+        Returns (job_id, status, created). An existing job for the same deal and brief is returned as is.
+        """
+        brief_hash = hashlib.sha256(f"{BRIEF_VERSION}\n{design_brief(deal)}".encode("utf-8")).hexdigest()[:16]
+        now = time.time()
+        def add():
+            cur = self.conn.execute("""
+                INSERT OR IGNORE INTO render_jobs (deal_id, brief_hash, deal, priority, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (str(deal["id"]), brief_hash, json.dumps(deal), float(deal.get("value_score") or 0), now, now))
+            row = self.conn.execute(
+                "SELECT id, status FROM render_jobs WHERE deal_id = ? AND brief_hash = ?", (str(deal["id"]), brief_hash)
+            ).fetchone()
+            return row[0], row[1], cur.rowcount == 1
+        return self._write(add)
+
+    def reclaim_orphans(self):
+        """
+        Re-queues jobs left 'running' by dead workers on this host (crash / restart).
+        Other hosts' jobs come back when their lease expires.
+        """
+        host = socket.gethostname()
+        with self._lock:
+            rows = self.conn.execute("SELECT id, owner FROM render_jobs WHERE status = 'running'").fetchall()
+        orphans = [job_id for job_id, owner in rows if owner and owner.rsplit("-", 1)[0] == host and not _pid_alive(owner.rsplit("-", 1)[1])]
+        if orphans:
+            # A job that already used all its attempts (e.g. keeps crashing the worker) fails instead
+            self._write(lambda: self.conn.executemany("""
+                UPDATE render_jobs SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'queued' END,
+                    error = CASE WHEN attempts >= ? THEN 'worker died during render' ELSE error END,
+                    owner = NULL, lease_expires = NULL
+                WHERE id = ? AND status = 'running'
+            """, [(self.max_attempts, self.max_attempts, job_id) for job_id in orphans]))
+            print(f"[*] Render queue: recovered {len(orphans)} interrupted jobs")
+
+    def claim(self):
+        """
+        Leases the next job (highest priority first). Returns (job_id, deal) or None.
+        """
+        now = time.time()
+        def take():
+            # Expired leases whose attempts are used up fail instead of looping forever
+            self.conn.execute("""
+                UPDATE render_jobs SET status = 'failed', error = 'lease expired during render', owner = NULL, lease_expires = NULL, updated_at = ?
+                WHERE status = 'running' AND lease_expires < ? AND attempts >= ?
+            """, (now, now, self.max_attempts))
+            row = self.conn.execute("""
+                SELECT id, deal FROM render_jobs
+                WHERE status = 'queued' OR (status = 'running' AND lease_expires < ?)
+                ORDER BY priority DESC, id LIMIT 1
+            """, (now,)).fetchone()
+            if not row:
+                return None
+            self.conn.execute("""
+                UPDATE render_jobs SET status = 'running', owner = ?, lease_expires = ?, attempts = attempts + 1, updated_at = ?
+                WHERE id = ?
+            """, (self.owner, now + self.lease_seconds, now, row[0]))
+            return row[0], json.loads(row[1])
+        return self._write(take)
+
+    def renew(self):
+        """
+        Extends the lease on every job this process is rendering.
+        """
+        now = time.time()
+        self._write(lambda: self.conn.execute(
+            "UPDATE render_jobs SET lease_expires = ?, updated_at = ? WHERE owner = ? AND status = 'running'",
+            (now + self.lease_seconds, now, self.owner)
+        ))
+
+    def finish(self, job_id, output_path=None, error=None):
+        """
+        Records a render result. Failures go back to the queue until max_attempts.
+        """
+        now = time.time()
+        def done():
+            if output_path:
+                self.conn.execute(
+                    "UPDATE render_jobs SET status = 'done', output_path = ?, error = NULL, owner = NULL, lease_expires = NULL, updated_at = ? WHERE id = ?",
+                    (output_path, now, job_id)
+                )
+            else:
+                self.conn.execute("""
+                    UPDATE render_jobs SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'queued' END,
+                        error = ?, owner = NULL, lease_expires = NULL, updated_at = ?
+                    WHERE id = ?
+                """, (self.max_attempts, error or "render failed", now, job_id))
+        self._write(done)
+
+    def job(self, job_id):
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT id, deal_id, status, attempts, output_path, error FROM render_jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        if not row:
+            return None
+        return dict(zip(("job_id", "deal_id", "status", "attempts", "output_path", "error"), row))
+
+    def counts(self):
+        with self._lock:
+            return dict(self.conn.execute("SELECT status, COUNT(*) FROM render_jobs GROUP BY status").fetchall())
+
+def _pid_alive(pid):
+    try:
+        os.kill(int(pid), 0)
+        return True
+    except (ValueError, ProcessLookupError):
+        return False
+    except PermissionError:
+        return True
+
+_queue = None
+
+def get_queue():
+    global _queue
+    if _queue is None:
+        _queue = RenderQueue()
+    return _queue
+
+def queue_ad(deal, queue=None):
+    """
+    Queues a video ad render for a deal (deduplicated). Returns the job dict.
+    """
+    queue = queue or get_queue()
+    job_id, status, created = queue.enqueue(deal)
+    print(f"[*] Render job {job_id} for {deal.get('brand', 'Unknown')}: {'queued' if created else 'already ' + status}")
+    return queue.job(job_id)
+
+def run_render_workers(queue=None, concurrency=RENDER_CONCURRENCY, video_model=None, director=None, stop_when_idle=True, poll_seconds=5.0):
+    """
+    Drains the render queue with up to `concurrency` renders in flight.
+    With stop_when_idle=False it keeps polling for new jobs (long-running worker).
+    Returns the number of jobs processed.
+    """
+    queue = queue or get_queue()
+    if video_model is None:
+        video_model = load_veo_model()
+    processed = 0
+    processed_lock = threading.Lock()
+
+    def worker():
+        nonlocal processed
+        while True:
+            claimed = queue.claim()
+            if not claimed:
+                if stop_when_idle:
+                    return
+                time.sleep(poll_seconds)
+                continue
+            job_id, deal = claimed
+            try:
+                output_path = create_cinematic_ad(deal, video_model=video_model, director=director)
+                queue.finish(job_id, output_path=output_path, error=None if output_path else "render failed")
+            except Exception as e:
+                queue.finish(job_id, error=str(e))
+            with processed_lock:
+                processed += 1
+
+    # Renders can outlast the lease: keep it fresh while we are alive, so no
+    # other worker starts the same render
+    stop = threading.Event()
+    def heartbeat():
+        while not stop.wait(queue.lease_seconds / 3):
+            try:
+                queue.renew()
+            except Exception as e:
+                print(f"[!] Render lease renewal failed: {e}")
+    beat = threading.Thread(target=heartbeat, daemon=True)
+    beat.start()
+
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+            for _ in range(max(1, concurrency)):
+                pool.submit(worker)
+    finally:
+        stop.set()
+
+    print(f"[*] Render workers done: {processed} jobs {queue.counts()}")
+    return processed
+
 # For testing
+# Usage: python video_gen.py          -> queue the test deal and render it with Veo
+#        python video_gen.py --stub   -> same pipeline with the stub video model and director
 if __name__ == "__main__":
     test_deal = {
         "id": 999,
@@ -91,4 +424,8 @@ if __name__ == "__main__":
         "discount_amount": "50%",
         "summary": "The ultimate AI Automated Intelligence Agency."
     }
-    create_cinematic_ad(test_deal)
+    queue_ad(test_deal)
+    if "--stub" in sys.argv:
+        run_render_workers(video_model=StubVideoModel(), director=lambda brief: "A neon wolf sprinting through a data storm.")
+    else:
+        run_render_workers()
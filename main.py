@@ -1,9 +1,17 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 import os
 import uvicorn
 import json
+import asyncio
+import datetime
+import uuid
+import gzip
+import hashlib
+import email.utils
+import threading
 from extraction.scrapers.bounty_hunter import hunt_bounties
+from database.deals_db import connect, search_deals, top_deals
 
 app = FastAPI()
 
@@ -20,50 +28,198 @@ app.add_middleware(
 def read_root():
     return {"status": "Cyberhound Neural Net Online", "version": "3.3"}
 
+# --- INTEL CACHE ---
+# The ticker polls /latest_deals.json constantly: keep the payload parsed and
+# pre-serialized (plain + gzip) in memory, invalidated by file mtime or save_intel().
+INTEL_PATH = "latest_deals.json"
+
+class IntelCache:
+    def __init__(self, path=INTEL_PATH):
+        self.path = path
+        self.entry = None
+        self._lock = threading.Lock()
+
+    def _build(self, data, mtime_ns):
+        body = json.dumps(data).encode("utf-8")
+        digest = hashlib.sha1(body).hexdigest()[:16]
+        return {
+            "data": data,
+            "body": body,
+            "gzip": gzip.compress(body, compresslevel=6),
+            "etag": f'"{digest}"',
+            "etag_gzip": f'"{digest}-gz"',
+            "mtime_ns": mtime_ns,
+            "last_modified": email.utils.formatdate(mtime_ns / 1e9, usegmt=True)
+        }
+
+    def get(self):
+        """
+        Returns the cached entry, reloading only if the file changed on disk.
+        None if the file does not exist yet.
+        """
+        try:
+            mtime_ns = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+        entry = self.entry
+        if entry and entry["mtime_ns"] == mtime_ns:
+            return entry
+        with self._lock:
+            if self.entry and self.entry["mtime_ns"] == mtime_ns:
+                return self.entry
+            with open(self.path, "r") as f:
+                data = json.load(f)
+            self.entry = self._build(data, mtime_ns)
+            return self.entry
+
+    def set(self, data):
+        # Explicit invalidation right after we write the file ourselves
+        with self._lock:
+            self.entry = self._build(data, os.stat(self.path).st_mtime_ns)
+
+INTEL_CACHE = IntelCache()
+
+def is_not_modified(request, entry):
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        tags = {t.strip().removeprefix("W/") for t in if_none_match.split(",")}
+        return "*" in tags or entry["etag"] in tags or entry["etag_gzip"] in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            since = email.utils.parsedate_to_datetime(if_modified_since).timestamp()
+            return int(entry["mtime_ns"] / 1e9) <= since
+        except (TypeError, ValueError):
+            return False
+    return False
+
 @app.get("/latest_deals.json")
-def get_intel():
+def get_intel(request: Request):
     """
     Returns the latest intercepted bounties.
-    If the file exists, reading from it (cache).
+    If the file exists, serving it from the in-memory cache (ETag / 304 / gzip).
     If not, it triggers a fresh hunt.
     """
     try:
-        if os.path.exists("latest_deals.json"):
-            with open("latest_deals.json", "r") as f:
-                data = json.load(f)
-                return data
-        else:
+        entry = INTEL_CACHE.get()
+        if entry is None:
             # First run auto-trigger
             return hunt_bounties()
+
+        use_gzip = "gzip" in request.headers.get("accept-encoding", "")
+        headers = {
+            "ETag": entry["etag_gzip"] if use_gzip else entry["etag"],
+            "Last-Modified": entry["last_modified"],
+            "Cache-Control": "no-cache",
+            "Vary": "Accept-Encoding"
+        }
+        if is_not_modified(request, entry):
+            return Response(status_code=304, headers=headers)
+        if use_gzip:
+            headers["Content-Encoding"] = "gzip"
+            return Response(content=entry["gzip"], media_type="application/json", headers=headers)
+        return Response(content=entry["body"], media_type="application/json", headers=headers)
     except Exception as e:
         return {"error": str(e)}
 
+# --- DEAL SEARCH ---
+@app.get("/api/deals")
+def list_deals(q: str = "", limit: int = 20):
+    """
+    Active deals from deals.db: full-text search when `q` is given, else the top scores.
+    """
+    limit = max(1, min(limit, 100))
+    try:
+        conn = connect()
+        try:
+            deals = search_deals(conn, q, limit) if q.strip() else top_deals(conn, limit)
+        finally:
+            conn.close()
+        return {"query": q, "count": len(deals), "deals": deals}
+    except Exception as e:
+        return {"error": str(e)}
+
+# --- SCAN JOBS ---
+# Hunts run off the event loop; concurrent triggers join the in-flight job.
+SCAN_JOBS = {}
+MAX_SCAN_JOBS = 20
+_inflight_job_id = None
+
+def save_intel(intel):
+    """
+    Atomically replaces latest_deals.json so readers never see a half-written file.
+    """
+    tmp_path = f"{INTEL_PATH}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(intel, f)
+    os.replace(tmp_path, INTEL_PATH)
+    INTEL_CACHE.set(intel)
+
+def run_headhunter():
+    # 1. EXECUTE THE HUNT (blocking HTTP, runs in a worker thread)
+    new_intel = hunt_bounties()
+
+    # 2. SAVE INTEL (To local JSON for the frontend to read)
+    save_intel(new_intel)
+    return new_intel
+
+async def execute_scan(job):
+    global _inflight_job_id
+    try:
+        new_intel = await asyncio.to_thread(run_headhunter)
+        job.update({
+            "status": "SUCCESS",
+            "intel_count": len(new_intel),
+            "intel": new_intel
+        })
+    except Exception as e:
+        print(f"🚨 MISSION FAILURE: {e}")
+        job.update({"status": "FAILED", "error": str(e)})
+    finally:
+        job["finished_at"] = datetime.datetime.now().isoformat()
+        _inflight_job_id = None
+
+def public_job(job):
+    return {k: v for k, v in job.items() if k != "task"}
+
 @app.post("/api/scan")
 async def trigger_scan():
     """
     Activates the Headhunter Protocol.
-    Scrapes real jobs and converts them to Bounties.
+    Returns a job id immediately; poll /api/scan/{job_id} for the bounties.
+    A trigger while a hunt is running joins that hunt instead of starting another.
     """
+    global _inflight_job_id
     print("🐺 COMMAND RECEIVED: Initiate Headhunter Protocol")
 
-    try:
-        # 1. EXECUTE THE HUNT
-        new_intel = hunt_bounties()
-        
-        # 2. SAVE INTEL (To local JSON for the frontend to read)
-        with open("latest_deals.json", "w") as f:
-            json.dump(new_intel, f)
+    if _inflight_job_id:
+        job = SCAN_JOBS[_inflight_job_id]
+        return {"mission": "Headhunter Scan", "joined": True, **public_job(job)}
 
-        return {
-            "mission": "Headhunter Scan",
-            "intel_count": len(new_intel),
-            "status": "SUCCESS",
-            "intel": new_intel
-        }
+    job = {
+        "job_id": uuid.uuid4().hex[:12],
+        "status": "RUNNING",
+        "started_at": datetime.datetime.now().isoformat()
+    }
+    SCAN_JOBS[job["job_id"]] = job
+    _inflight_job_id = job["job_id"]
 
-    except Exception as e:
-        print(f"�� MISSION FAILURE: {e}")
-        return {"status": "FAILED", "error": str(e)}
+    # Forget the oldest finished jobs
+    while len(SCAN_JOBS) > MAX_SCAN_JOBS:
+        SCAN_JOBS.pop(next(iter(SCAN_JOBS)))
+
+    job["task"] = asyncio.create_task(execute_scan(job))
+    return {"mission": "Headhunter Scan", "joined": False, **public_job(job)}
+
+@app.get("/api/scan/{job_id}")
+def scan_status(job_id: str):
+    """
+    Status of a Headhunter scan job: RUNNING, SUCCESS (with intel) or FAILED.
+    """
+    job = SCAN_JOBS.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Unknown scan job")
+    return {"mission": "Headhunter Scan", **public_job(job)}
 
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 8080))
@@ -1,12 +1,27 @@
 import os
 import json
+import asyncio
+import sqlite3
+import threading
+import time
 import google.generativeai as genai
 from datetime import datetime
 
 # --- CONFIGURATION ---
-HISTORY_FILE = "posted_log.json"
+HISTORY_FILE = "posted_log.json" # Legacy list, imported into HISTORY_DB once
+HISTORY_DB = os.getenv("CYBERHOUND_POSTED_DB", "posted_log.db")
+HISTORY_TTL_DAYS = float(os.getenv("CYBERHOUND_POSTED_TTL_DAYS", "30"))
+HISTORY_COMPACT_EVERY = 200 # marks between expiry sweeps
 TWITTER_API_KEY = os.getenv("TWITTER_API_KEY")
 TWITTER_API_SECRET = os.getenv("TWITTER_API_SECRET")
+BROADCAST_CONCURRENCY = int(os.getenv("BROADCAST_CONCURRENCY", "8")) # copy generations in flight
+# Posts per minute per channel (0 = unlimited). The Twitter pace dominates a real
+# drop: at 10/min, 100 deals take ~9 minutes after the first minute's burst.
+# Only the console channel posts a 100-deal drop in seconds.
+CHANNEL_RATE_LIMITS = {
+    "twitter": float(os.getenv("TWITTER_POSTS_PER_MINUTE", "10")),
+    "console": 0
+}
 
 # Initialize Gemini (The Cortex)
 # Try main key then fallback
@@ -15,37 +30,118 @@ if apikey:
     genai.configure(api_key=apikey)
 
 # --- 1. THE MEMORY (Deduplication) ---
-def load_history():
-    if not os.path.exists(HISTORY_FILE):
-        return []
-    try:
-        with open(HISTORY_FILE, "r") as f:
-            return json.load(f)
-    except:
-        return []
+class PostedHistory:
+    """
+    Posted deal ids: an in-memory dict (O(1) membership) over a SQLite table.
+    claim() is an atomic INSERT OR IGNORE, so concurrent posters (threads or
+    processes sharing the file) never post the same deal twice. Entries older
+    than ttl_days expire; expired rows are swept every `compact_every` marks.
+    """
+
+    def __init__(self, path=HISTORY_DB, ttl_days=HISTORY_TTL_DAYS, compact_every=HISTORY_COMPACT_EVERY, legacy_path=HISTORY_FILE):
+        self.ttl_seconds = ttl_days * 86400
+        self.compact_every = compact_every
+        self._marks = 0
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS posted (deal_id TEXT PRIMARY KEY, posted_at REAL NOT NULL)")
+        self.conn.commit()
+        self._import_legacy(legacy_path)
+        self.compact()
+
+    def _import_legacy(self, legacy_path):
+        if not legacy_path or not os.path.exists(legacy_path):
+            return
+        if self.conn.execute("SELECT 1 FROM posted LIMIT 1").fetchone():
+            return
+        try:
+            with open(legacy_path, "r") as f:
+                ids = json.load(f)
+        except Exception:
+            return
+        now = time.time()
+        self.conn.executemany("INSERT OR IGNORE INTO posted (deal_id, posted_at) VALUES (?, ?)", ((str(i), now) for i in ids))
+        self.conn.commit()
+        print(f"🧠 MEMORY: Imported {len(ids)} ids from {legacy_path}")
 
-def save_history(history):
-    with open(HISTORY_FILE, "w") as f:
-        json.dump(history, f)
+    def compact(self):
+        """
+        Drops expired ids from disk and memory, and reloads what other posters added.
+        """
+        cutoff = time.time() - self.ttl_seconds
+        with self._lock:
+            self.conn.execute("DELETE FROM posted WHERE posted_at < ?", (cutoff,))
+            self.conn.commit()
+            self._seen = dict(self.conn.execute("SELECT deal_id, posted_at FROM posted"))
+
+    def __contains__(self, deal_id):
+        deal_id = str(deal_id)
+        posted_at = self._seen.get(deal_id)
+        if posted_at is not None:
+            return posted_at >= time.time() - self.ttl_seconds
+        # Not seen by this poster: another one may have posted it since
+        with self._lock:
+            row = self.conn.execute("SELECT posted_at FROM posted WHERE deal_id = ?", (deal_id,)).fetchone()
+        if row and row[0] >= time.time() - self.ttl_seconds:
+            self._seen[deal_id] = row[0]
+            return True
+        return False
+
+    def claim(self, deal_id):
+        """
+        Atomically records deal_id as posted. False if it already was (and hasn't expired).
+        """
+        deal_id, now = str(deal_id), time.time()
+        with self._lock:
+            self.conn.execute("DELETE FROM posted WHERE deal_id = ? AND posted_at < ?", (deal_id, now - self.ttl_seconds))
+            claimed = self.conn.execute("INSERT OR IGNORE INTO posted (deal_id, posted_at) VALUES (?, ?)", (deal_id, now)).rowcount == 1
+            self.conn.commit()
+            if claimed:
+                self._seen[deal_id] = now
+            self._marks += 1
+            due = self._marks % self.compact_every == 0
+        if due:
+            self.compact()
+        return claimed
+
+    def release(self, deal_id):
+        """
+        Undoes a claim whose post failed, so the deal can be retried.
+        """
+        with self._lock:
+            self.conn.execute("DELETE FROM posted WHERE deal_id = ?", (str(deal_id),))
+            self.conn.commit()
+            self._seen.pop(str(deal_id), None)
+
+HISTORY = PostedHistory()
 
 def is_posted(deal_id):
-    history = load_history()
-    return str(deal_id) in history
+    return deal_id in HISTORY
 
 def mark_posted(deal_id):
-    history = load_history()
-    history.append(str(deal_id))
-    save_history(history)
+    return HISTORY.claim(deal_id)
 
 # --- 2. THE CORTEX (AI Copywriting) ---
+_model = None
+
+def get_model():
+    global _model
+    if _model is None:
+        _model = genai.GenerativeModel("gemini-1.5-flash")
+    return _model
+
+def fallback_tweet(deal):
+    return f"🚨 SIGNAL DETECTED: {deal.get('brand')} - {deal.get('price')} \n{deal.get('url')}"
+
 async def generate_tweet(deal):
     """
     Uses Gemini to craft a viral, cyberpunk-themed tweet.
     """
     if not apikey:
-        return f"🚨 SIGNAL DETECTED: {deal.get('brand')} - {deal.get('price')} \n{deal.get('url')}"
+        return fallback_tweet(deal)
 
-    model = genai.GenerativeModel("gemini-1.5-flash")
+    model = get_model()
     
     prompt = f"""
     You are Cyberhound, an elite autonomous deal hunter.
@@ -63,23 +159,57 @@ async def generate_tweet(deal):
     """
     
     try:
-        response = model.generate_content(prompt)
+        # Never block the event loop: native async call, else a worker thread
+        if hasattr(model, "generate_content_async"):
+            response = await model.generate_content_async(prompt)
+        else:
+            response = await asyncio.to_thread(model.generate_content, prompt)
         return response.text.strip()
     except Exception as e:
         print(f"🧠 CORTEX FAILURE: {e}")
-        return f"🚨 SIGNAL DETECTED: {deal.get('brand')} - {deal.get('price')} \n{deal.get('url')}"
+        return fallback_tweet(deal)
 
 # --- 3. THE TRANSMITTER (Broadcasting) ---
-async def broadcast(deal):
-    if is_posted(deal['id']):
-        # Stealth mode: don't spam console
-        return "SKIPPED"
+class ChannelLimiter:
+    """
+    Async token bucket: up to `per_minute` posts per minute, bursts of one minute's worth.
+    """
 
-    print(f"⚡ CORTEX: Analyzing {deal['brand']}...")
-    tweet_content = await generate_tweet(deal)
-    
-    # --- TRANSMISSION PATHS ---
-    if TWITTER_API_KEY:
+    def __init__(self, per_minute):
+        self.rate = per_minute / 60.0
+        self.capacity = max(1.0, per_minute)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        if not self.rate:
+            return
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+_limiters = {}
+
+def channel_limiter(channel):
+    # One bucket per channel per event loop (asyncio.Lock is loop-bound)
+    key = (channel, id(asyncio.get_running_loop()))
+    if key not in _limiters:
+        _limiters[key] = ChannelLimiter(CHANNEL_RATE_LIMITS.get(channel, 0))
+    return _limiters[key]
+
+def current_channel():
+    return "twitter" if TWITTER_API_KEY else "console"
+
+async def transmit(channel, tweet_content):
+    await channel_limiter(channel).acquire()
+    if channel == "twitter":
         # PATH A: OFFICIAL API (To be implemented with Tweepy/Requests)
         print(f"🐦 [OFFICIAL CHANNEL] Posting: {tweet_content}")
         # TODO: Implement actual API call here
@@ -87,6 +217,67 @@ async def broadcast(deal):
     else:
         # PATH B: ROGUE MODE (Console Simulation for now)
         print(f"🏴‍☠️ [ROGUE SIMULATION] Tweet Generated:\n{'-'*20}\n{tweet_content}\n{'-'*20}")
-    
-    mark_posted(deal['id'])
-    return "POSTED"
+
+async def broadcast_deal(deal, semaphore=None):
+    """
+    Claims, writes and posts one deal. Returns its outcome:
+    {id, brand, status: POSTED | SKIPPED | FAILED, channel, copy_seconds, post_seconds, total_seconds[, error]}
+    """
+    started = time.perf_counter()
+    outcome = {"id": deal.get("id"), "brand": deal.get("brand"), "channel": current_channel(),
+               "copy_seconds": 0.0, "post_seconds": 0.0}
+
+    # Claim first: a concurrent poster that got here earlier wins
+    if not mark_posted(deal['id']):
+        # Stealth mode: don't spam console
+        outcome["status"] = "SKIPPED"
+        outcome["total_seconds"] = round(time.perf_counter() - started, 3)
+        return outcome
+
+    try:
+        print(f"⚡ CORTEX: Analyzing {deal['brand']}...")
+        t0 = time.perf_counter()
+        if semaphore:
+            async with semaphore:
+                tweet_content = await generate_tweet(deal)
+        else:
+            tweet_content = await generate_tweet(deal)
+        outcome["copy_seconds"] = round(time.perf_counter() - t0, 3)
+
+        # --- TRANSMISSION PATHS ---
+        t0 = time.perf_counter()
+        await transmit(outcome["channel"], tweet_content)
+        outcome["post_seconds"] = round(time.perf_counter() - t0, 3)
+        outcome["status"] = "POSTED"
+    except Exception as e:
+        HISTORY.release(deal['id'])
+        outcome.update({"status": "FAILED", "error": str(e)})
+
+    outcome["total_seconds"] = round(time.perf_counter() - started, 3)
+    return outcome
+
+async def broadcast(deal):
+    outcome = await broadcast_deal(deal)
+    if outcome["status"] == "FAILED":
+        raise RuntimeError(outcome["error"])
+    return outcome["status"]
+
+async def broadcast_many(deals, concurrency=BROADCAST_CONCURRENCY):
+    """
+    Broadcasts a drop of deals concurrently: at most `concurrency` copy
+    generations in flight, posts paced per channel (CHANNEL_RATE_LIMITS).
+    Returns one outcome per deal, in input order.
+    Copy generation is concurrent; total time on a paced channel is bounded by its rate.
+    """
+    started = time.perf_counter()
+    rate = CHANNEL_RATE_LIMITS.get(current_channel(), 0)
+    if rate and len(deals) > rate:
+        print(f"📡 BROADCAST: {current_channel()} paced at {rate:g}/min, ~{(len(deals) - rate) / rate:.0f} min for this drop")
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    outcomes = await asyncio.gather(*(broadcast_deal(deal, semaphore) for deal in deals))
+
+    counts = {}
+    for outcome in outcomes:
+        counts[outcome["status"]] = counts.get(outcome["status"], 0) + 1
+    print(f"📡 BROADCAST: {len(deals)} deals in {time.perf_counter() - started:.1f}s {counts}")
+    return outcomes